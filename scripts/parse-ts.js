@@ -863,7 +863,8 @@ if (!filePath) {
 
 try {
   const result = parseFile(filePath);
-  console.log(JSON.stringify(result, null, 2));
+  // Compact output: it is only consumed by the Python side, indentation just inflates stdout
+  console.log(JSON.stringify(result));
 } catch (error) {
   console.error(JSON.stringify({ error: error.message, stack: error.stack }));
   process.exit(1);
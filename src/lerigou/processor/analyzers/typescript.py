@@ -109,7 +109,30 @@ class TypeScriptAnalyzer(CodeParser):
             temp_path.unlink()
 
     def _convert_to_code_element(self, data: dict, file_path: str) -> CodeElement:
-        """Converte o JSON do parser para CodeElement."""
+        """
+        Converte o JSON do parser para CodeElement.
+
+        Usa uma pilha explícita em vez de recursão, evitando o custo de um frame
+        por nível e o limite de recursão em árvores de componentes profundas.
+        """
+        root = self._build_element(data, file_path)
+        stack = [(root, iter(data.get("children", [])))]
+
+        while stack:
+            parent, children = stack[-1]
+            child_data = next(children, None)
+            if child_data is None:
+                stack.pop()
+                continue
+
+            child = self._build_element(child_data, file_path)
+            parent.add_child(child)
+            stack.append((child, iter(child_data.get("children", []))))
+
+        return root
+
+    def _build_element(self, data: dict, file_path: str) -> CodeElement:
+        """Constrói um CodeElement a partir do JSON, sem os filhos."""
         element_type = self._map_element_type(data.get("element_type", "module"))
 
         element = CodeElement(
@@ -178,14 +201,10 @@ class TypeScriptAnalyzer(CodeParser):
                     line_number=api_call.get("line_number", 0),
                     is_external=api_call.get("is_external", False),
                     matched_endpoint=api_call.get("matched_endpoint"),
+                    file_path=file_path,
                 )
             )
 
-        # Converte filhos recursivamente
-        for child_data in data.get("children", []):
-            child = self._convert_to_code_element(child_data, file_path)
-            element.add_child(child)
-
         return element
 
     def _map_element_type(self, type_str: str) -> ElementType:
@@ -33,15 +33,16 @@ class EndpointMatcher:
     - Futuramente: Flask, Express, NestJS, etc.
     """
 
-    def __init__(self, repo_path: Path):
+    def __init__(self, repo_path: Path, cache_dir: Path | None = None):
         """
         Inicializa o matcher.
 
         Args:
             repo_path: Caminho raiz do repositório
+            cache_dir: Diretório do cache de ASTs em disco (padrão: ~/.cache/lerigou/ast)
         """
         self.repo_path = repo_path
-        self._fastapi_scanner = FastAPIScanner()
+        self._fastapi_scanner = FastAPIScanner(cache_dir)
         self._endpoints: dict[str, EndpointInfo] = {}
         self._scanned = False
 
@@ -0,0 +1,93 @@
+"""Cache persistente em disco de árvores AST Python."""
+
+import ast
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+from pathlib import Path
+
+# Versão do formato do cache (incrementar ao mudar a forma de serialização)
+CACHE_FORMAT_VERSION = 2
+
+
+def default_cache_dir() -> Path:
+    """Retorna o diretório padrão do cache (respeita XDG_CACHE_HOME)."""
+    base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "lerigou" / "ast"
+
+
+class AstDiskCache:
+    """
+    Cache em disco de árvores AST, indexado pelo SHA-256 do código fonte.
+
+    Cada árvore é serializada com pickle em `<cache_dir>/<python>/<xx>/<sha256>.pkl`,
+    onde `<xx>` são os dois primeiros caracteres do hash (evita diretórios enormes).
+    A versão do Python faz parte do caminho, já que as classes do módulo ast
+    mudam entre versões. Falhas de leitura/escrita nunca interrompem o parse:
+    o cache é apenas uma otimização.
+    """
+
+    def __init__(self, cache_dir: Path | None = None):
+        version = f"py{sys.version_info.major}{sys.version_info.minor}-v{CACHE_FORMAT_VERSION}"
+        self.cache_dir = (cache_dir or default_cache_dir()) / version
+
+    def parse(self, source: str | bytes, filename: str = "<unknown>") -> ast.Module:
+        """
+        Parseia código fonte, reaproveitando a árvore do disco quando existir.
+
+        Prefira passar os bytes lidos do arquivo: o parser do CPython trabalha
+        em UTF-8 e o hash é calculado sem reencodar o texto.
+
+        Args:
+            source: Código fonte Python (texto ou bytes do arquivo)
+            filename: Nome do arquivo (para mensagens de erro)
+
+        Returns:
+            Árvore AST do módulo
+        """
+        cache_path = self._cache_path(source)
+
+        tree = self._load(cache_path)
+        if tree is not None:
+            return tree
+
+        tree = compile(source, filename, "exec", ast.PyCF_ONLY_AST, dont_inherit=True)
+        self._store(cache_path, tree)
+        return tree
+
+    def _cache_path(self, source: str | bytes) -> Path:
+        """Calcula o arquivo de cache para um código fonte."""
+        if isinstance(source, str):
+            source = source.encode("utf-8", "surrogatepass")
+        digest = hashlib.sha256(source).hexdigest()
+        return self.cache_dir / digest[:2] / f"{digest}.pkl"
+
+    def _load(self, cache_path: Path) -> ast.Module | None:
+        """Carrega uma árvore do disco, ou None se ausente/inválida."""
+        try:
+            with cache_path.open("rb") as f:
+                tree = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Entrada corrompida ou incompatível: será regravada
+            return None
+
+        return tree if isinstance(tree, ast.Module) else None
+
+    def _store(self, cache_path: Path, tree: ast.Module) -> None:
+        """Grava uma árvore no disco de forma atômica."""
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=cache_path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(tree, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_name, cache_path)
+            except BaseException:
+                os.unlink(tmp_name)
+                raise
+        except (OSError, pickle.PicklingError, RecursionError):
+            pass
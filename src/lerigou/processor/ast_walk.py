@@ -0,0 +1,48 @@
+"""Travessias de árvores AST restritas a statements."""
+
+import ast
+from collections import deque
+from collections.abc import Iterator
+
+# Campos que contêm listas de statements, na ordem em que aparecem em `_fields`
+STATEMENT_FIELDS = ("body", "handlers", "orelse", "finalbody", "cases")
+
+# Tipo de nó -> seus campos de statements (vazio para statements simples)
+_FIELDS_BY_TYPE: dict[type, tuple[str, ...]] = {}
+
+
+def _statement_fields(node_type: type) -> tuple[str, ...]:
+    """Retorna (e cacheia) os campos de statements que um tipo de nó possui."""
+    fields = _FIELDS_BY_TYPE.get(node_type)
+    if fields is None:
+        fields = tuple(name for name in STATEMENT_FIELDS if name in node_type._fields)
+        _FIELDS_BY_TYPE[node_type] = fields
+    return fields
+
+
+def iter_statements(tree: ast.Module) -> Iterator[ast.AST]:
+    """
+    Percorre em largura apenas os statements de uma árvore.
+
+    Produz os statements na mesma ordem relativa de ast.walk, mas sem visitar
+    expressões (statements nunca aparecem dentro delas). Serve para buscas por
+    nós que só existem como statements: imports, atribuições, definições etc.
+    Os handlers de except e os cases de match também são produzidos.
+
+    Statements simples (atribuições, expressões, imports, return...) não têm
+    statements filhos: os campos a olhar são resolvidos uma vez por tipo de nó,
+    então esses nós custam só uma busca em dict.
+    """
+    fields_by_type = _FIELDS_BY_TYPE
+    queue = deque(tree.body)
+    while queue:
+        node = queue.popleft()
+        yield node
+        node_type = type(node)
+        fields = fields_by_type.get(node_type)
+        if fields is None:
+            fields = _statement_fields(node_type)
+        for name in fields:
+            children = getattr(node, name, None)
+            if children:
+                queue.extend(children)
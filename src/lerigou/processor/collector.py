@@ -1,10 +1,48 @@
 """Coletor de código que segue chamadas de função e imports."""
 
 import ast
+import atexit
+import io
+import json
+import os
+import re
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
+from functools import cached_property
+from itertools import accumulate, chain
+from operator import attrgetter
 from pathlib import Path
+from typing import TextIO
 
+from lerigou.processor.api_matcher import EndpointMatcher
+from lerigou.processor.ast_cache import AstDiskCache
+from lerigou.processor.ast_walk import iter_statements
 from lerigou.processor.models import APICall, CodeElement, Import
+from lerigou.processor.parser import CodeParser, get_parser_for_file
+
+
+class _ChunkCode:
+    """
+    Descriptor de CodeChunk.code.
+
+    O código passado ao construtor é usado como está; sem ele, é extraído no
+    primeiro acesso com uma única fatia de `source` (o conteúdo do arquivo,
+    compartilhado entre os chunks) delimitada por `line_offsets` (a posição de
+    início de cada linha).
+    """
+
+    def __get__(self, chunk: "CodeChunk | None", owner: type | None = None) -> str | None:
+        if chunk is None:
+            return None  # Valor padrão do campo no dataclass
+        if chunk._code is None:
+            chunk._code = chunk._extract_code()
+        return chunk._code
+
+    def __set__(self, chunk: "CodeChunk", code: str | None) -> None:
+        chunk._code = code
 
 
 @dataclass
@@ -12,7 +50,6 @@ class CodeChunk:
     """Representa um pedaço de código coletado."""
 
     name: str
-    code: str
     file_path: str
     line_start: int
     line_end: int
@@ -22,10 +59,101 @@ class CodeChunk:
     calls: list[str] = field(default_factory=list)
     imports: list[str] = field(default_factory=list)
     api_calls: list[APICall] = field(default_factory=list)
+    # Sem código explícito, é extraído de source/line_offsets no primeiro acesso
+    code: str | None = _ChunkCode()  # type: ignore[assignment]
+    source: str = field(default="", repr=False, compare=False)
+    line_offsets: list[int] = field(default_factory=list, repr=False, compare=False)
+
+    def _extract_code(self) -> str:
+        """Código do chunk (linhas line_start..line_end do arquivo)."""
+        offsets = self.line_offsets
+        last = len(offsets) - 1
+        if last < 1:
+            return ""
+        start = offsets[min(max(0, self.line_start - 1), last)]
+        # O início da linha seguinte, sem a quebra de linha
+        end = offsets[min(self.line_end, last)] - 1
+        return self.source[start:end] if end > start else ""
 
 
 SERVICE_KEYWORDS = ("service", "api", "client", "backend", "fetch", "http")
 
+# Qualquer uma das SERVICE_KEYWORDS, sem diferenciar maiúsculas (uma única busca)
+SERVICE_KEYWORDS_RE = re.compile("|".join(map(re.escape, SERVICE_KEYWORDS)), re.IGNORECASE)
+
+# Máximo de arquivos mantidos em cache entre coletas
+MAX_CACHED_FILES = 512
+
+# Máximo de threads para parsear arquivos de serviço do frontend
+SERVICE_PARSE_WORKERS = 8
+
+# Chave de um chunk coletado: (arquivo, nome qualificado), com o arquivo internado
+ChunkKey = tuple[str, str]
+
+# Ordem dos tipos de chunk na saída (tipos desconhecidos vão para o fim)
+CHUNK_TYPE_ORDER = {"function": 0, "class": 1, "method": 2}
+
+# Tipos de nós de definição; comparados por identidade de tipo (`type(node) in ...`),
+# que é mais barato que isinstance e exato para as classes concretas do ast
+_FUNC_TYPES = frozenset({ast.FunctionDef, ast.AsyncFunctionDef})
+_DEF_TYPES = _FUNC_TYPES | {ast.ClassDef}
+
+# Sufixos tentados ao resolver imports TypeScript/JavaScript, em ordem
+TS_IMPORT_SUFFIXES = (".ts", ".tsx", ".js", ".jsx", "/index.ts", "/index.tsx", "/index.js")
+
+# Definições de nível superior (coluna 0), para descobrir nomes sem parsear o arquivo
+TOP_DEF = re.compile(r"(?m)^(?:async\s+)?(?:def|class)\s+(\w+)")
+
+# Qualquer ocorrência da palavra import (conservador: strings e comentários também contam)
+HAS_IMPORT = re.compile(r"\bimport\b")
+
+
+def _api_call_key(api_call: APICall) -> tuple[str, str, str, str, int]:
+    """
+    Identifica uma chamada de API pelos dados do código (arquivo, método, path,
+    cliente, linha).
+
+    Os campos de match (is_external, matched_endpoint) ficam de fora: eles são
+    preenchidos depois, no mesmo objeto, e não mudam qual chamada ele é.
+    """
+    return (
+        api_call.file_path,
+        api_call.method,
+        api_call.path,
+        api_call.client,
+        api_call.line_number,
+    )
+
+
+def _open_debug_log() -> TextIO | None:
+    """Abre o log de depuração indicado em LERIGOU_DEBUG_LOG, se definido."""
+    path = os.environ.get("LERIGOU_DEBUG_LOG")
+    if not path:
+        return None
+    try:
+        handle = open(path, "a", encoding="utf-8", buffering=65536)
+    except OSError:
+        return None
+    atexit.register(handle.close)
+    return handle
+
+
+# Handle único (bufferizado) do log de depuração; None desliga o log.
+# Os pontos de log testam `if _DEBUG_LOG:` para nem montar o payload.
+_DEBUG_LOG = _open_debug_log()
+
+
+def _debug(hypothesis_id: str, location: str, message: str, data: dict) -> None:
+    """Escreve um evento JSON por linha no log de depuração."""
+    event = {
+        "hypothesisId": hypothesis_id,
+        "location": location,
+        "message": message,
+        "data": data,
+        "timestamp": time.time(),
+    }
+    _DEBUG_LOG.write(json.dumps(event, separators=(",", ":"), default=str) + "\n")
+
 
 @dataclass
 class CollectedCode:
@@ -34,68 +162,95 @@ class CollectedCode:
     entrypoint: str
     chunks: list[CodeChunk]
     all_imports: list[str]
-    concatenated_code: str
     api_calls: list[APICall] = field(default_factory=list)
     frontend_component: str | None = None  # Nome do componente frontend de origem
 
+    @cached_property
+    def concatenated_code(self) -> str:
+        """Código concatenado dos chunks de backend (para análise)."""
+        buffer = io.StringIO()
+        write = buffer.write
+        separator = ""
+        for chunk in self.chunks:
+            if chunk.language != "python":
+                continue
+            # O código é escrito direto no buffer, sem uma cópia intermediária por chunk
+            write(f"{separator}# {chunk.chunk_type}: {chunk.name}\n")
+            write(chunk.code)
+            separator = "\n\n"
+        return buffer.getvalue()
+
     def to_prompt_context(self) -> str:
         """Gera o contexto de código para o prompt da IA."""
-        sections = []
-
         # Separa chunks de backend
         backend_chunks = [c for c in self.chunks if c.language == "python"]
 
-        # #region agent log
-        import json as _json; open("/Users/leonardog/dev/lerigou/.cursor/debug.log", "a").write(_json.dumps({"hypothesisId": "D", "location": "collector.py:to_prompt_context:start", "message": "Building prompt context", "data": {"total_chunks": len(self.chunks), "backend_chunks": len(backend_chunks), "frontend_component": self.frontend_component, "api_calls_count": len(self.api_calls)}, "timestamp": __import__("time").time()}) + "\n")
-        # #endregion
+        if _DEBUG_LOG:
+            _debug(
+                "D",
+                "collector.py:to_prompt_context:start",
+                "Building prompt context",
+                {
+                    "total_chunks": len(self.chunks),
+                    "backend_chunks": len(backend_chunks),
+                    "frontend_component": self.frontend_component,
+                    "api_calls_count": len(self.api_calls),
+                },
+            )
+
+        # Cada linha é escrita com "\n" no final; o último é removido no fim
+        buffer = io.StringIO()
+        write = buffer.write
 
         # Se veio do frontend, mostra resumo das chamadas de API
         if self.frontend_component and self.api_calls:
-            sections.append("## Frontend → Backend\n")
-            sections.append(
+            write("## Frontend → Backend\n\n")
+            write(
                 f"O componente `{self.frontend_component}` "
-                "faz as seguintes chamadas de API:\n"
+                "faz as seguintes chamadas de API:\n\n"
             )
             for api in self.api_calls:
                 if api.matched_endpoint:
-                    sections.append(f"- **{api.method} {api.path}** → `{api.matched_endpoint}`")
+                    write(f"- **{api.method} {api.path}** → `{api.matched_endpoint}`\n")
                 else:
-                    sections.append(f"- **{api.method} {api.path}** → (API externa)")
-            sections.append("")
+                    write(f"- **{api.method} {api.path}** → (API externa)\n")
+            write("\n")
 
         # Backend: código completo para análise de fluxo
         if backend_chunks:
-            sections.append("## Código Backend (analisar fluxo)\n")
+            write("## Código Backend (analisar fluxo)\n\n")
             for chunk in backend_chunks:
-                header = f"### {chunk.chunk_type.upper()}: {chunk.name}"
-                if chunk.file_path:
-                    header += f" (from {Path(chunk.file_path).name})"
-                sections.append(header)
-                sections.append(f"```python\n{chunk.code}\n```")
-                if chunk.calls:
-                    sections.append(f"Calls: {', '.join(chunk.calls)}")
-                sections.append("")
+                self._write_chunk(write, chunk, "python")
         elif not self.frontend_component:
             # Fallback: mostra todos os chunks (código Python puro)
-            sections.append(f"## Entrypoint: {self.entrypoint}\n")
+            write(f"## Entrypoint: {self.entrypoint}\n\n")
             for chunk in self.chunks:
-                header = f"### {chunk.chunk_type.upper()}: {chunk.name}"
-                if chunk.file_path:
-                    header += f" (from {Path(chunk.file_path).name})"
-                sections.append(header)
-                sections.append(f"```{chunk.language}\n{chunk.code}\n```")
-                if chunk.calls:
-                    sections.append(f"Calls: {', '.join(chunk.calls)}")
-                sections.append("")
-
-        result = "\n".join(sections)
-
-        # #region agent log
-        import json as _json; open("/Users/leonardog/dev/lerigou/.cursor/debug.log", "a").write(_json.dumps({"hypothesisId": "D", "location": "collector.py:to_prompt_context:end", "message": "Prompt context built", "data": {"result_length": len(result), "result_preview": result[:200] if result else "EMPTY"}, "timestamp": __import__("time").time()}) + "\n")
-        # #endregion
+                self._write_chunk(write, chunk, chunk.language)
+
+        result = buffer.getvalue()[:-1]
+
+        if _DEBUG_LOG:
+            _debug(
+                "D",
+                "collector.py:to_prompt_context:end",
+                "Prompt context built",
+                {
+                    "result_length": len(result),
+                    "result_preview": result[:200] if result else "EMPTY",
+                },
+            )
 
         return result
 
+    def _write_chunk(self, write, chunk: CodeChunk, language: str) -> None:
+        """Escreve a seção de um chunk no contexto do prompt (uma única escrita)."""
+        source = f" (from {os.path.basename(chunk.file_path)})" if chunk.file_path else ""
+        calls = f"Calls: {', '.join(chunk.calls)}\n" if chunk.calls else ""
+        write(
+            f"### {chunk.chunk_type.upper()}: {chunk.name}{source}\n"
+            f"```{language}\n{chunk.code}\n```\n{calls}\n"
+        )
+
 
 class CodeCollector:
     """
@@ -106,18 +261,106 @@ class CodeCollector:
     - Imports locais (do mesmo projeto)
     - Métodos de classes instanciadas
     - Chamadas de API (conectando frontend ao backend)
+
+    O conteúdo e a AST dos arquivos são cacheados entre coletas (até
+    MAX_CACHED_FILES arquivos, revalidados por mtime/tamanho a cada coleta;
+    use reset() para descartá-los). As ASTs também são persistidas em disco.
+
+    As docstrings dos chunks só são extraídas com include_docstrings=True: o
+    contexto do prompt não as usa (elas já estão no código do chunk).
     """
 
-    def __init__(self, base_path: Path | None = None, follow_api_calls: bool = True):
+    def __init__(
+        self,
+        base_path: Path | None = None,
+        follow_api_calls: bool = True,
+        cache_dir: Path | None = None,
+        include_docstrings: bool = False,
+    ):
         self.base_path = base_path or Path.cwd()
         self.follow_api_calls = follow_api_calls
-        self._collected: dict[str, CodeChunk] = {}
-        self._visited: set[str] = set()
-        self._file_cache: dict[str, str] = {}
+        self.include_docstrings = include_docstrings
+        self._collected: dict[ChunkKey, CodeChunk] = {}
+        self._visited: set[ChunkKey] = set()
+        # Caches entre coletas (LRU: o mais recente no fim)
+        self._file_cache: OrderedDict[str, str] = OrderedDict()
+        self._file_signatures: dict[str, tuple[int, int]] = {}  # (mtime_ns, size)
+        # Bytes lidos de arquivos ainda não parseados (entrada direta do parser)
+        self._raw_sources: dict[str, bytes] = {}
         self._ast_cache: dict[str, ast.Module] = {}
+        # Funções/classes de nível superior de cada arquivo parseado, por nome
+        self._symbol_index: dict[str, dict[str, ast.stmt]] = {}
+        # Arquivo -> posição de início de cada linha (mais a posição após o fim)
+        self._line_offsets: dict[str, list[int]] = {}
+        # (nome local, import completo) dos imports de nível superior de cada arquivo
+        self._import_index: dict[str, dict[str, list[tuple[int, str]]]] = {}
+        # Arquivo -> nome -> primeira função com esse nome (em qualquer nível)
+        self._function_index: dict[str, dict[str, ast.FunctionDef | ast.AsyncFunctionDef]] = {}
+        # Arquivo -> (nomes definidos na coluna 0, contém imports), obtidos por regex
+        self._top_level_names: dict[str, tuple[frozenset[str], bool]] = {}
+        # Arquivos já revalidados na coleta atual
+        self._fresh_files: set[str] = set()
+        self._disk_cache_dir = cache_dir
+        self._disk_cache = AstDiskCache(cache_dir)
         self._import_map: dict[str, Path] = {}
+        # Segmento de nome (ex: "utils" em "app.utils.helpers") -> imports do _import_map
+        self._import_segment_index: dict[str, list[str]] = {}
+        # Resolução de imports por coleta: (módulo, diretório) -> caminho (ou None)
+        self._resolve_cache: dict[tuple[str, str], Path | None] = {}
+        self._dir_entries: dict[Path | str, frozenset[str]] = {}
+        self._file_checks: dict[Path, bool] = {}
+        # Resolução de imports TS: (módulo, diretório do arquivo) -> caminho
+        self._ts_resolve_cache: dict[tuple[str, Path], Path | None] = {}
+        # Diretório -> src/ do projeto frontend que o contém
+        self._frontend_src_cache: dict[Path, Path | None] = {}
+        # Incrementado sempre que o _import_map muda (invalida as chamadas seguidas)
+        self._import_generation = 0
+        # (arquivo, chamada) sem destino -> geração do _import_map em que falhou
+        self._unresolved_calls: dict[tuple[str, str], int] = {}
+        # (arquivo, chamada) já seguida -> geração do _import_map em que foi seguida
+        self._resolved_calls: dict[tuple[str, str], int] = {}
+        # Arquivos importados cujos imports já foram coletados
+        self._imports_collected: set[str] = set()
         self._api_calls: list[APICall] = []
-        self._endpoint_matcher = None
+        self._api_call_keys: set[tuple[str, str, str, str, int]] = set()
+        # Criado uma vez; o escaneamento dos endpoints só acontece sob demanda
+        self._endpoint_matcher: EndpointMatcher | None = (
+            EndpointMatcher(self.base_path, self._disk_cache_dir) if follow_api_calls else None
+        )
+
+    def reset(self) -> None:
+        """Descarta todo o estado, incluindo os caches de arquivos e ASTs em memória."""
+        self._reset_run_state()
+        self._file_cache.clear()
+        self._file_signatures.clear()
+        self._raw_sources.clear()
+        self._ast_cache.clear()
+        self._symbol_index.clear()
+        self._line_offsets.clear()
+        self._import_index.clear()
+        self._function_index.clear()
+        self._top_level_names.clear()
+        if self._endpoint_matcher is not None:
+            self._endpoint_matcher = EndpointMatcher(self.base_path, self._disk_cache_dir)
+
+    def _reset_run_state(self) -> None:
+        """Descarta o estado de uma coleta (os caches de arquivos são mantidos)."""
+        self._collected.clear()
+        self._visited.clear()
+        self._fresh_files.clear()
+        self._import_map.clear()
+        self._import_segment_index.clear()
+        self._resolve_cache.clear()
+        self._dir_entries.clear()
+        self._file_checks.clear()
+        self._ts_resolve_cache.clear()
+        self._frontend_src_cache.clear()
+        self._import_generation = 0
+        self._unresolved_calls.clear()
+        self._resolved_calls.clear()
+        self._imports_collected.clear()
+        self._api_calls.clear()
+        self._api_call_keys.clear()
 
     def collect_from_entrypoint(
         self,
@@ -134,12 +377,9 @@ class CodeCollector:
         Returns:
             CollectedCode com todos os chunks coletados
         """
-        self._collected.clear()
-        self._visited.clear()
-        self._file_cache.clear()
-        self._ast_cache.clear()
-        self._import_map.clear()
-        self._api_calls.clear()
+        # Os caches de arquivos/ASTs são mantidos entre coletas
+        self._reset_run_state()
+        self._evict_cached_files()
 
         # Detecta a linguagem do arquivo
         language = self._detect_language(file_path)
@@ -165,20 +405,13 @@ class CodeCollector:
         if language in ("typescript", "javascript"):
             frontend_component = entrypoint or file_path.stem
 
-        # Gera código concatenado (apenas backend para análise)
-        backend_chunks = [c for c in chunks if c.language == "python"]
-        concatenated = "\n\n".join(
-            f"# {c.chunk_type}: {c.name}\n{c.code}" for c in backend_chunks
-        )
-
-        # Coleta todos os imports únicos
-        all_imports = list(set(imp for c in chunks for imp in c.imports))
+        # Coleta todos os imports únicos (mantendo a ordem)
+        all_imports = list(dict.fromkeys(chain.from_iterable(c.imports for c in chunks)))
 
         return CollectedCode(
             entrypoint=entrypoint or file_path.stem,
             chunks=chunks,
             all_imports=all_imports,
-            concatenated_code=concatenated,
             api_calls=self._api_calls,
             frontend_component=frontend_component,
         )
@@ -199,24 +432,30 @@ class CodeCollector:
         NÃO coleta o código frontend completo - apenas identifica quais endpoints são chamados
         e segue para coletar o código backend correspondente.
         """
-        from lerigou.processor.parser import get_parser_for_file
-        # #region agent log
-        import json as _json; open("/Users/leonardog/dev/lerigou/.cursor/debug.log", "a").write(_json.dumps({"hypothesisId": "A", "location": "collector.py:_collect_typescript:start", "message": "Starting TS collection", "data": {"file": str(file_path), "entrypoint": entrypoint}, "timestamp": __import__("time").time()}) + "\n")
-        # #endregion
+        if _DEBUG_LOG:
+            _debug(
+                "A",
+                "collector.py:_collect_typescript:start",
+                "Starting TS collection",
+                {"file": str(file_path), "entrypoint": entrypoint},
+            )
 
         parser = get_parser_for_file(file_path)
         if not parser:
-            # #region agent log
-            import json as _json; open("/Users/leonardog/dev/lerigou/.cursor/debug.log", "a").write(_json.dumps({"hypothesisId": "A", "location": "collector.py:_collect_typescript:no_parser", "message": "No parser found", "data": {}, "timestamp": __import__("time").time()}) + "\n")
-            # #endregion
+            if _DEBUG_LOG:
+                _debug("A", "collector.py:_collect_typescript:no_parser", "No parser found", {})
             return
 
         try:
             element = parser.parse_file(file_path)
         except Exception as e:
-            # #region agent log
-            import json as _json; open("/Users/leonardog/dev/lerigou/.cursor/debug.log", "a").write(_json.dumps({"hypothesisId": "A", "location": "collector.py:_collect_typescript:parse_error", "message": "Parse error", "data": {"error": str(e)}, "timestamp": __import__("time").time()}) + "\n")
-            # #endregion
+            if _DEBUG_LOG:
+                _debug(
+                    "A",
+                    "collector.py:_collect_typescript:parse_error",
+                    "Parse error",
+                    {"error": str(e)},
+                )
             return
 
         # Coleta API calls do componente/função especificado ou de todo o módulo
@@ -232,15 +471,31 @@ class CodeCollector:
 
         component_element = found or element
 
-        # #region agent log
-        import json as _json; open("/Users/leonardog/dev/lerigou/.cursor/debug.log", "a").write(_json.dumps({"hypothesisId": "A", "location": "collector.py:_collect_typescript:direct_api_calls", "message": "Direct API calls found", "data": {"count": len(all_api_calls), "calls": [{"method": c.method, "path": c.path} for c in all_api_calls]}, "timestamp": __import__("time").time()}) + "\n")
-        # #endregion
+        if _DEBUG_LOG:
+            _debug(
+                "A",
+                "collector.py:_collect_typescript:direct_api_calls",
+                "Direct API calls found",
+                {
+                    "count": len(all_api_calls),
+                    "calls": [{"method": c.method, "path": c.path} for c in all_api_calls],
+                },
+            )
 
         service_imports = self._filter_service_imports(element.imports)
         service_usage = self._find_used_service_functions(component_element, service_imports)
-        # #region agent log
-        import json as _json; open("/Users/leonardog/dev/lerigou/.cursor/debug.log", "a").write(_json.dumps({"hypothesisId": "A", "location": "collector.py:_collect_typescript:service_usage", "message": "Service import usage", "data": {"imports": len(service_imports), "used_modules": {module: sorted(list(funcs)) for module, funcs in service_usage.items()}}, "timestamp": __import__("time").time()}) + "\n")
-        # #endregion
+        if _DEBUG_LOG:
+            _debug(
+                "A",
+                "collector.py:_collect_typescript:service_usage",
+                "Service import usage",
+                {
+                    "imports": len(service_imports),
+                    "used_modules": {
+                        module: sorted(list(funcs)) for module, funcs in service_usage.items()
+                    },
+                },
+            )
 
         if service_usage:
             service_api_calls = self._collect_service_api_calls(
@@ -258,12 +513,7 @@ class CodeCollector:
 
     def _filter_service_imports(self, imports: list[Import]) -> list[Import]:
         """Retorna apenas imports que parecem arquivos de serviço."""
-        return [
-            imp
-            for imp in imports
-            if imp.module
-            and any(kw in imp.module.lower() for kw in SERVICE_KEYWORDS)
-        ]
+        return [imp for imp in imports if imp.module and SERVICE_KEYWORDS_RE.search(imp.module)]
 
     def _get_import_alias_map(self, imp: Import) -> dict[str, str]:
         """Constroi um mapa local -> importado para um import statement."""
@@ -281,15 +531,6 @@ class CodeCollector:
 
         return alias_map
 
-    def _resolve_service_function_name(
-        self, call, alias_map: dict[str, str], local_name: str
-    ) -> str:
-        """Retorna o nome real da função do serviço considerando alias."""
-        imported = alias_map.get(local_name)
-        if not imported or imported in ("*", "default"):
-            return call.name
-        return imported
-
     def _find_used_service_functions(
         self, element: CodeElement, service_imports: list[Import]
     ) -> dict[str, set[str]]:
@@ -298,25 +539,26 @@ class CodeCollector:
         if not service_imports:
             return usage
 
-        calls = element.get_all_calls()
-        for imp in service_imports:
-            alias_map = self._get_import_alias_map(imp)
-            if not alias_map:
+        # Índice invertido: nome local -> [(posição do import, nome importado)]
+        local_names: dict[str, list[tuple[int, str]]] = {}
+        for index, imp in enumerate(service_imports):
+            for local, imported in self._get_import_alias_map(imp).items():
+                local_names.setdefault(local, []).append((index, imported))
+
+        # Uma única passada pelas chamadas
+        used_by_import: dict[int, set[str]] = {}
+        for call in element.get_all_calls():
+            bindings = local_names.get(call.target or call.name)
+            if not bindings:
                 continue
-
-            used_names: set[str] = set()
-            for call in calls:
-                if call.target and call.target in alias_map:
-                    resolved = self._resolve_service_function_name(
-                        call, alias_map, call.target
-                    )
-                    used_names.add(resolved)
-                elif not call.target and call.name in alias_map:
-                    resolved = self._resolve_service_function_name(
-                        call, alias_map, call.name
-                    )
-                    used_names.add(resolved)
-
+            for index, imported in bindings:
+                if not imported or imported in ("*", "default"):
+                    imported = call.name
+                used_by_import.setdefault(index, set()).add(imported)
+
+        # Na ordem dos imports (um import posterior do mesmo módulo prevalece)
+        for index, imp in enumerate(service_imports):
+            used_names = used_by_import.get(index)
             if used_names:
                 usage[imp.module] = used_names
 
@@ -329,10 +571,10 @@ class CodeCollector:
         usage_map: dict[str, set[str]],
     ) -> list[APICall]:
         """Coleta as chamadas de API dos módulos de serviço usados."""
-        from lerigou.processor.parser import get_parser_for_file
-
         collected: list[APICall] = []
+        seen: set[tuple[str, str, str, str, int]] = set()
         processed_modules: set[str] = set()
+        tasks: list[tuple[CodeParser, Path, set[str]]] = []
         for imp in service_imports:
             module = imp.module
             if not module or module not in usage_map:
@@ -343,53 +585,105 @@ class CodeCollector:
                 continue
 
             service_path = self._resolve_ts_import(module, file_path)
-            if not service_path or not service_path.exists():
-                # #region agent log
-                import json as _json; open("/Users/leonardog/dev/lerigou/.cursor/debug.log", "a").write(_json.dumps({"hypothesisId": "A", "location": "collector.py:_collect_service_api_calls:not_found", "message": "Service file not found", "data": {"module": module, "resolved": str(service_path) if service_path else None}, "timestamp": __import__("time").time()}) + "\n")
-                # #endregion
+            # Import que não resolve para um arquivo do projeto (ex: pacote do npm)
+            if not service_path:
+                if _DEBUG_LOG:
+                    _debug(
+                        "A",
+                        "collector.py:_collect_service_api_calls:not_found",
+                        "Service file not found",
+                        {"module": module, "resolved": None},
+                    )
                 continue
 
             if module in processed_modules:
                 continue
 
             processed_modules.add(module)
-            # #region agent log
-            import json as _json; open("/Users/leonardog/dev/lerigou/.cursor/debug.log", "a").write(_json.dumps({"hypothesisId": "A", "location": "collector.py:_collect_service_api_calls:parsing", "message": "Parsing service file", "data": {"path": str(service_path), "functions": list(functions)}, "timestamp": __import__("time").time()}) + "\n")
-            # #endregion
+            if _DEBUG_LOG:
+                _debug(
+                    "A",
+                    "collector.py:_collect_service_api_calls:parsing",
+                    "Parsing service file",
+                    {"path": str(service_path), "functions": list(functions)},
+                )
 
             service_parser = get_parser_for_file(service_path)
             if not service_parser:
                 continue
 
+            tasks.append((service_parser, service_path, functions))
+
+        # Os parsers TS rodam em subprocessos: parseia os serviços em paralelo
+        # e agrega os resultados na ordem original
+        for (_, service_path, functions), result in zip(tasks, self._parse_service_files(tasks)):
             try:
-                service_element = service_parser.parse_file(service_path)
+                if isinstance(result, Exception):
+                    raise result
+                service_element = result
                 for func_name in functions:
                     target = service_element.find_element(func_name)
                     if not target:
-                        # #region agent log
-                        import json as _json; open("/Users/leonardog/dev/lerigou/.cursor/debug.log", "a").write(_json.dumps({"hypothesisId": "A", "location": "collector.py:_collect_service_api_calls:not_found_function", "message": "Function not found in service", "data": {"path": str(service_path), "function": func_name}, "timestamp": __import__("time").time()}) + "\n")
-                        # #endregion
+                        if _DEBUG_LOG:
+                            _debug(
+                                "A",
+                                "collector.py:_collect_service_api_calls:not_found_function",
+                                "Function not found in service",
+                                {"path": str(service_path), "function": func_name},
+                            )
                         continue
 
                     for api_call in target.get_all_api_calls():
-                        if api_call not in collected:
+                        key = _api_call_key(api_call)
+                        if key not in seen:
+                            seen.add(key)
                             collected.append(api_call)
 
-                # #region agent log
-                import json as _json; open("/Users/leonardog/dev/lerigou/.cursor/debug.log", "a").write(_json.dumps({"hypothesisId": "A", "location": "collector.py:_collect_service_api_calls:found", "message": "Found API calls in service", "data": {"path": str(service_path), "count": len(collected), "calls": [{"method": c.method, "path": c.path} for c in collected]} , "timestamp": __import__("time").time()}) + "\n")
-                # #endregion
+                if _DEBUG_LOG:
+                    _debug(
+                        "A",
+                        "collector.py:_collect_service_api_calls:found",
+                        "Found API calls in service",
+                        {
+                            "path": str(service_path),
+                            "count": len(collected),
+                            "calls": [{"method": c.method, "path": c.path} for c in collected],
+                        },
+                    )
             except Exception as e:
-                # #region agent log
-                import json as _json; open("/Users/leonardog/dev/lerigou/.cursor/debug.log", "a").write(_json.dumps({"hypothesisId": "A", "location": "collector.py:_collect_service_api_calls:error", "message": "Error parsing service", "data": {"path": str(service_path), "error": str(e)}, "timestamp": __import__("time").time()}) + "\n")
-                # #endregion
+                if _DEBUG_LOG:
+                    _debug(
+                        "A",
+                        "collector.py:_collect_service_api_calls:error",
+                        "Error parsing service",
+                        {"path": str(service_path), "error": str(e)},
+                    )
                 continue
 
         return collected
 
+    def _parse_service_files(
+        self, tasks: list[tuple[CodeParser, Path, set[str]]]
+    ) -> list[CodeElement | Exception]:
+        """Parseia arquivos de serviço, em threads quando há mais de um."""
+
+        def parse(task: tuple[CodeParser, Path, set[str]]) -> CodeElement | Exception:
+            service_parser, service_path, _ = task
+            try:
+                return service_parser.parse_file(service_path)
+            except Exception as e:
+                return e
+
+        if len(tasks) < 2:
+            return [parse(task) for task in tasks]
+
+        with ThreadPoolExecutor(max_workers=min(SERVICE_PARSE_WORKERS, len(tasks))) as pool:
+            return list(pool.map(parse, tasks))
+
     def _resolve_ts_import(self, module: str, from_file: Path) -> Path | None:
         """
         Resolve um import TypeScript para um caminho de arquivo.
-        
+
         Suporta:
         - Caminhos relativos: ./service, ../utils/api
         - Alias @/: @/services/backendService -> src/services/backendService
@@ -397,64 +691,80 @@ class CodeCollector:
         if not module:
             return None
 
-        # Tenta encontrar o diretório base do projeto frontend
-        frontend_src = None
-        current = from_file.parent
-        while current != current.parent:
-            if (current / "src").is_dir():
-                frontend_src = current / "src"
-                break
-            if (current / "tsconfig.json").exists() or (current / "package.json").exists():
-                if (current / "src").is_dir():
-                    frontend_src = current / "src"
-                break
-            current = current.parent
+        cache_key = (module, from_file.parent)
+        if cache_key in self._ts_resolve_cache:
+            return self._ts_resolve_cache[cache_key]
 
-        # Resolve alias @/ para src/
+        resolved = None
+        base_path = None
         if module.startswith("@/"):
+            # Resolve alias @/ para src/
+            frontend_src = self._find_frontend_src(from_file.parent)
             if frontend_src:
-                relative_path = module[2:]  # Remove @/
-                base_path = frontend_src / relative_path
-            else:
-                return None
+                base_path = frontend_src / module[2:]
         elif module.startswith("./") or module.startswith("../"):
             # Caminho relativo
             base_path = from_file.parent / module
-        else:
-            # Módulo npm, ignorar
-            return None
+        # Outros são módulos npm: ignorados
+
+        if base_path is not None:
+            # Tenta diferentes extensões (consultando a listagem cacheada do diretório)
+            base = os.fspath(base_path)
+            for suffix in TS_IMPORT_SUFFIXES:
+                directory, name = os.path.split(base + suffix)
+                if name in self._list_dir(directory):
+                    resolved = Path(directory, name)
+                    break
+            else:
+                # Tenta o caminho exato (caso já tenha extensão)
+                if os.path.isfile(base):
+                    resolved = base_path
 
-        # Tenta diferentes extensões
-        extensions = [".ts", ".tsx", ".js", ".jsx", "/index.ts", "/index.tsx", "/index.js"]
-        for ext in extensions:
-            candidate = Path(str(base_path) + ext)
-            if candidate.exists():
-                return candidate
+        self._ts_resolve_cache[cache_key] = resolved
+        return resolved
 
-        # Tenta o caminho exato (caso já tenha extensão)
-        if base_path.exists() and base_path.is_file():
-            return base_path
+    def _find_frontend_src(self, start: Path) -> Path | None:
+        """
+        Encontra o diretório src/ do projeto frontend subindo a partir de `start`.
 
-        return None
+        O resultado é cacheado para todos os diretórios percorridos, já que a
+        busca a partir de qualquer um deles terminaria no mesmo lugar.
+        """
+        visited = []
+        current = start
+        while True:
+            if current in self._frontend_src_cache:
+                frontend_src = self._frontend_src_cache[current]
+                break
+            visited.append(current)
+            if current == current.parent:
+                frontend_src = None
+                break
+            names = self._list_dir(current)
+            if "src" in names and (current / "src").is_dir():
+                frontend_src = current / "src"
+                break
+            if "tsconfig.json" in names or "package.json" in names:
+                # Raiz do projeto sem src/
+                frontend_src = None
+                break
+            current = current.parent
+
+        for directory in visited:
+            self._frontend_src_cache[directory] = frontend_src
+        return frontend_src
 
     def _add_element_chunk(self, element, file_path: Path, source: str, language: str) -> None:
         """Adiciona um CodeElement como um CodeChunk."""
-        from lerigou.processor.models import CodeElement
-
         if not isinstance(element, CodeElement):
             return
 
-        full_key = f"{file_path}:{element.name}"
+        file_key = sys.intern(str(file_path))
+        full_key = (file_key, element.name)
         if full_key in self._visited:
             return
         self._visited.add(full_key)
 
-        # Extrai o código
-        lines = source.splitlines()
-        start = max(0, element.line_number - 1)
-        end = element.end_line_number or element.line_number
-        code = "\n".join(lines[start:end])
-
         # Converte chamadas para lista de strings
         calls = [f"{c.target}.{c.name}" if c.target else c.name for c in element.calls]
 
@@ -463,42 +773,51 @@ class CodeCollector:
 
         chunk = CodeChunk(
             name=element.name,
-            code=code,
-            file_path=str(file_path),
+            file_path=file_key,
             line_start=element.line_number,
             line_end=element.end_line_number or element.line_number,
             chunk_type=element.element_type.value,
             language=language,
-            docstring=element.docstring,
+            docstring=element.docstring if self.include_docstrings else None,
             calls=calls,
             imports=imports,
             api_calls=list(element.api_calls),
+            source=source,
+            line_offsets=self._get_line_offsets(file_path, source),
         )
 
         self._collected[full_key] = chunk
 
         # Adiciona API calls à lista global
         for api_call in element.api_calls:
-            if api_call not in self._api_calls:
-                self._api_calls.append(api_call)
+            self._add_api_call(api_call)
 
     def _process_api_calls(self, api_calls: list[APICall]) -> None:
         """Processa chamadas de API e segue para o backend se encontrado."""
-        # #region agent log
-        import json as _json; open("/Users/leonardog/dev/lerigou/.cursor/debug.log", "a").write(_json.dumps({"hypothesisId": "B", "location": "collector.py:_process_api_calls:start", "message": "Processing API calls", "data": {"count": len(api_calls), "base_path": str(self.base_path)}, "timestamp": __import__("time").time()}) + "\n")
-        # #endregion
-
-        if not self._endpoint_matcher:
-            from lerigou.processor.api_matcher import EndpointMatcher
-
-            self._endpoint_matcher = EndpointMatcher(self.base_path)
+        if _DEBUG_LOG:
+            _debug(
+                "B",
+                "collector.py:_process_api_calls:start",
+                "Processing API calls",
+                {"count": len(api_calls), "base_path": str(self.base_path)},
+            )
 
         for api_call in api_calls:
             result = self._endpoint_matcher.match(api_call)
 
-            # #region agent log
-            import json as _json; open("/Users/leonardog/dev/lerigou/.cursor/debug.log", "a").write(_json.dumps({"hypothesisId": "B", "location": "collector.py:_process_api_calls:match", "message": "Match result", "data": {"method": api_call.method, "path": api_call.path, "is_matched": result.is_matched, "backend_file": result.backend_file, "backend_function": result.backend_function}, "timestamp": __import__("time").time()}) + "\n")
-            # #endregion
+            if _DEBUG_LOG:
+                _debug(
+                    "B",
+                    "collector.py:_process_api_calls:match",
+                    "Match result",
+                    {
+                        "method": api_call.method,
+                        "path": api_call.path,
+                        "is_matched": result.is_matched,
+                        "backend_file": result.backend_file,
+                        "backend_function": result.backend_function,
+                    },
+                )
 
             if result.is_matched and result.backend_file:
                 # Atualiza a API call com informações do match
@@ -515,60 +834,161 @@ class CodeCollector:
                 api_call.is_external = True
 
             # Adiciona à lista de API calls
-            if api_call not in self._api_calls:
-                self._api_calls.append(api_call)
+            self._add_api_call(api_call)
+
+    def _add_api_call(self, api_call: APICall) -> None:
+        """Adiciona uma chamada de API à lista global, sem repetir."""
+        key = _api_call_key(api_call)
+        if key not in self._api_call_keys:
+            self._api_call_keys.add(key)
+            self._api_calls.append(api_call)
 
     def _collect_backend_endpoint(
         self, file_path: Path, function_name: str, line_number: int
     ) -> None:
         """Coleta o código de um endpoint do backend."""
-        # #region agent log
-        import json as _json; open("/Users/leonardog/dev/lerigou/.cursor/debug.log", "a").write(_json.dumps({"hypothesisId": "C", "location": "collector.py:_collect_backend_endpoint:start", "message": "Collecting backend endpoint", "data": {"file": str(file_path), "function": function_name, "line": line_number}, "timestamp": __import__("time").time()}) + "\n")
-        # #endregion
+        if _DEBUG_LOG:
+            _debug(
+                "C",
+                "collector.py:_collect_backend_endpoint:start",
+                "Collecting backend endpoint",
+                {"file": str(file_path), "function": function_name, "line": line_number},
+            )
 
-        full_key = f"{file_path}:{function_name}"
+        full_key = (sys.intern(str(file_path)), function_name)
         if full_key in self._visited:
-            # #region agent log
-            import json as _json; open("/Users/leonardog/dev/lerigou/.cursor/debug.log", "a").write(_json.dumps({"hypothesisId": "C", "location": "collector.py:_collect_backend_endpoint:already_visited", "message": "Already visited", "data": {"key": full_key}, "timestamp": __import__("time").time()}) + "\n")
-            # #endregion
+            if _DEBUG_LOG:
+                _debug(
+                    "C",
+                    "collector.py:_collect_backend_endpoint:already_visited",
+                    "Already visited",
+                    {"key": full_key},
+                )
             return
 
         source = self._read_file(file_path)
         tree = self._parse_file(file_path, source)
 
         # Encontra a função do endpoint
-        found = False
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                if node.name == function_name:
-                    found = True
-                    self._collect_function(node, file_path, source)
-
-        # #region agent log
-        import json as _json; open("/Users/leonardog/dev/lerigou/.cursor/debug.log", "a").write(_json.dumps({"hypothesisId": "C", "location": "collector.py:_collect_backend_endpoint:end", "message": "Backend collection done", "data": {"found": found, "collected_count": len(self._collected)}, "timestamp": __import__("time").time()}) + "\n")
-        # #endregion
+        node = self._get_function_index(file_path, tree).get(function_name)
+        found = node is not None
+        if found:
+            self._collect_function(node, file_path, source)
+
+        if _DEBUG_LOG:
+            _debug(
+                "C",
+                "collector.py:_collect_backend_endpoint:end",
+                "Backend collection done",
+                {"found": found, "collected_count": len(self._collected)},
+            )
 
     def _read_file(self, file_path: Path) -> str:
-        """Lê e cacheia o conteúdo de um arquivo."""
+        """
+        Lê e cacheia o conteúdo de um arquivo.
+
+        Na primeira leitura de cada coleta, o cache é revalidado pelo
+        mtime/tamanho do arquivo; se mudou, o conteúdo e a AST são descartados.
+        """
         key = str(file_path)
-        if key not in self._file_cache:
-            self._file_cache[key] = file_path.read_text(encoding="utf-8")
+        if key not in self._fresh_files:
+            stat = file_path.stat()
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if key not in self._file_cache or self._file_signatures.get(key) != signature:
+                data = file_path.read_bytes()
+                source = data.decode("utf-8")
+                if b"\r" in data:
+                    # Mesma tradução de quebras de linha de read_text()
+                    source = source.replace("\r\n", "\n").replace("\r", "\n")
+                self._file_cache[key] = source
+                self._raw_sources[key] = data
+                self._file_signatures[key] = signature
+                self._forget_derived(key)
+            self._fresh_files.add(key)
+
+        self._file_cache.move_to_end(key)
         return self._file_cache[key]
 
+    def _evict_cached_files(self) -> None:
+        """Descarta os arquivos menos usados recentemente além de MAX_CACHED_FILES."""
+        while len(self._file_cache) > MAX_CACHED_FILES:
+            key, _ = self._file_cache.popitem(last=False)
+            self._file_signatures.pop(key, None)
+            self._raw_sources.pop(key, None)
+            self._forget_derived(key)
+
+    def _forget_derived(self, key: str) -> None:
+        """Descarta os dados derivados do conteúdo de um arquivo (AST, índices, linhas)."""
+        self._ast_cache.pop(key, None)
+        self._symbol_index.pop(key, None)
+        self._line_offsets.pop(key, None)
+        self._import_index.pop(key, None)
+        self._function_index.pop(key, None)
+        self._top_level_names.pop(key, None)
+
+    def _get_line_offsets(self, file_path: Path, source: str) -> list[int]:
+        """
+        Retorna (e cacheia) a posição de início de cada linha de um arquivo.
+
+        Só "\\n" quebra linha, como na numeração de linhas do ast (splitlines
+        também quebraria em \\f, \\v, \\u2028 etc. e desalinharia os trechos).
+        O último elemento é len(source) + 1, o início de uma linha seguinte fictícia.
+        """
+        key = str(file_path)
+        offsets = self._line_offsets.get(key)
+        if offsets is None:
+            # Soma acumulada de (tamanho da linha + 1), toda em C
+            lengths = map((1).__add__, map(len, source.split("\n")))
+            offsets = self._line_offsets[key] = list(accumulate(lengths, initial=0))
+        return offsets
+
     def _parse_file(self, file_path: Path, source: str) -> ast.Module:
-        """Parseia e cacheia a AST de um arquivo."""
+        """Parseia e cacheia a AST de um arquivo (memória e disco)."""
         key = str(file_path)
         if key not in self._ast_cache:
-            self._ast_cache[key] = ast.parse(source, filename=str(file_path))
+            # Parseia os bytes originais quando disponíveis (sem reencodar)
+            raw = self._raw_sources.get(key, source)
+            self._store_ast(key, self._disk_cache.parse(raw, filename=key))
         return self._ast_cache[key]
 
+    def _store_ast(self, key: str, tree: ast.Module) -> None:
+        """Guarda a AST de um arquivo no cache em memória e indexa seus símbolos."""
+        self._raw_sources.pop(key, None)
+        self._ast_cache[key] = tree
+        self._symbol_index[key] = self._index_symbols(tree)
+
+    def _index_symbols(self, tree: ast.Module) -> dict[str, ast.stmt]:
+        """Indexa as funções e classes de nível superior por nome (a primeira vence)."""
+        symbols: dict[str, ast.stmt] = {}
+        for node in tree.body:
+            if type(node) in _DEF_TYPES:
+                symbols.setdefault(node.name, node)
+        return symbols
+
+    def _get_function_index(
+        self, file_path: Path, tree: ast.Module
+    ) -> dict[str, ast.FunctionDef | ast.AsyncFunctionDef]:
+        """Retorna (e cacheia) as funções de um arquivo por nome (a primeira vence)."""
+        key = str(file_path)
+        index = self._function_index.get(key)
+        if index is None:
+            index = {}
+            for node in iter_statements(tree):
+                if type(node) in _FUNC_TYPES:
+                    index.setdefault(node.name, node)
+            self._function_index[key] = index
+        return index
+
     def _collect_imports(self, tree: ast.Module, file_path: Path) -> None:
         """Coleta e mapeia imports locais."""
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Import):
+        Import = ast.Import
+        ImportFrom = ast.ImportFrom
+        for node in iter_statements(tree):
+            node_type = type(node)
+            if node_type is Import:
                 for alias in node.names:
                     self._try_resolve_import(alias.name, file_path)
-            elif isinstance(node, ast.ImportFrom):
+            elif node_type is ImportFrom:
                 if node.module:
                     self._try_resolve_import(node.module, file_path)
                     for alias in node.names:
@@ -577,32 +997,68 @@ class CodeCollector:
 
     def _try_resolve_import(self, module_name: str, from_file: Path) -> None:
         """Tenta resolver um import para um arquivo local."""
-        parts = module_name.split(".")
+        # Resultados (inclusive negativos) são memoizados durante a coleta
+        cache_key = (module_name, str(from_file.parent))
+        if cache_key in self._resolve_cache:
+            resolved = self._resolve_cache[cache_key]
+        else:
+            resolved = self._resolve_cache[cache_key] = self._find_import_path(
+                module_name, from_file.parent
+            )
 
-        # Tenta encontrar o arquivo no mesmo diretório ou subdiretórios
-        base_dir = from_file.parent
+        if resolved is not None:
+            self._register_import(module_name, resolved)
+
+    def _find_import_path(self, module_name: str, base_dir: Path) -> Path | None:
+        """Procura o arquivo (ou pacote) local correspondente a um import."""
+        parts = module_name.split(".")
 
-        # Tenta como arquivo direto
+        # Tenta como arquivo direto, no mesmo diretório ou subdiretórios
         for i in range(len(parts), 0, -1):
-            partial = "/".join(parts[:i])
-            candidate = base_dir / f"{partial}.py"
-            if candidate.exists():
-                self._import_map[module_name] = candidate
-                return
+            package_dir = base_dir.joinpath(*parts[: i - 1])
+            if f"{parts[i - 1]}.py" in self._list_dir(package_dir):
+                return package_dir / f"{parts[i - 1]}.py"
 
             # Tenta como pacote
-            candidate = base_dir / partial / "__init__.py"
-            if candidate.exists():
-                self._import_map[module_name] = candidate.parent
-                return
+            if "__init__.py" in self._list_dir(package_dir / parts[i - 1]):
+                return package_dir / parts[i - 1]
 
         # Tenta a partir do base_path
         for i in range(len(parts), 0, -1):
-            partial = "/".join(parts[:i])
-            candidate = self.base_path / f"{partial}.py"
-            if candidate.exists():
-                self._import_map[module_name] = candidate
-                return
+            package_dir = self.base_path.joinpath(*parts[: i - 1])
+            if f"{parts[i - 1]}.py" in self._list_dir(package_dir):
+                return package_dir / f"{parts[i - 1]}.py"
+
+        return None
+
+    def _is_file(self, path: Path) -> bool:
+        """Verifica (e cacheia durante a coleta) se um caminho é um arquivo."""
+        is_file = self._file_checks.get(path)
+        if is_file is None:
+            is_file = self._file_checks[path] = path.is_file()
+        return is_file
+
+    def _list_dir(self, directory: Path | str) -> frozenset[str]:
+        """Lista (e cacheia) os nomes de um diretório com um único os.scandir."""
+        entries = self._dir_entries.get(directory)
+        if entries is None:
+            try:
+                with os.scandir(directory) as it:
+                    entries = frozenset(entry.name for entry in it)
+            except OSError:
+                entries = frozenset()
+            self._dir_entries[directory] = entries
+        return entries
+
+    def _register_import(self, module_name: str, path: Path) -> None:
+        """Registra um import resolvido no _import_map e no índice por segmento."""
+        if module_name not in self._import_map:
+            for segment in dict.fromkeys(module_name.split(".")):
+                self._import_segment_index.setdefault(segment, []).append(module_name)
+        elif self._import_map[module_name] == path:
+            return
+        self._import_map[module_name] = path
+        self._import_generation += 1
 
     def _collect_entrypoint(
         self,
@@ -612,25 +1068,21 @@ class CodeCollector:
         entrypoint: str,
     ) -> None:
         """Coleta a partir de um entrypoint específico."""
-        # Busca a função/classe
+        # Busca a função/classe no índice de símbolos do arquivo
         parts = entrypoint.split(".")
+        node = self._symbol_index[str(file_path)].get(parts[0])
+        if node is None:
+            return
 
-        for node in tree.body:
-            if isinstance(node, ast.FunctionDef) and node.name == parts[0]:
-                self._collect_function(node, file_path, source)
-            elif isinstance(node, ast.AsyncFunctionDef) and node.name == parts[0]:
-                self._collect_function(node, file_path, source)
-            elif isinstance(node, ast.ClassDef) and node.name == parts[0]:
-                if len(parts) > 1:
-                    # Busca método específico
-                    for item in node.body:
-                        if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                            if item.name == parts[1]:
-                                self._collect_function(
-                                    item, file_path, source, class_name=node.name
-                                )
-                else:
-                    self._collect_class(node, file_path, source)
+        if type(node) is not ast.ClassDef:
+            self._collect_function(node, file_path, source)
+        elif len(parts) > 1:
+            # Busca método específico
+            for item in node.body:
+                if type(item) in _FUNC_TYPES and item.name == parts[1]:
+                    self._collect_function(item, file_path, source, class_name=node.name)
+        else:
+            self._collect_class(node, file_path, source)
 
     def _collect_module(
         self,
@@ -640,9 +1092,10 @@ class CodeCollector:
     ) -> None:
         """Coleta todas as funções e classes de um módulo."""
         for node in tree.body:
-            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            node_type = type(node)
+            if node_type in _FUNC_TYPES:
                 self._collect_function(node, file_path, source)
-            elif isinstance(node, ast.ClassDef):
+            elif node_type is ast.ClassDef:
                 self._collect_class(node, file_path, source)
 
     def _collect_function(
@@ -653,31 +1106,30 @@ class CodeCollector:
         class_name: str | None = None,
     ) -> None:
         """Coleta uma função e suas dependências."""
-        qualified_name = f"{class_name}.{node.name}" if class_name else node.name
-        full_key = f"{file_path}:{qualified_name}"
+        # Nomes internados: ASTs vindas do cache em disco têm cópias das strings
+        qualified_name = sys.intern(f"{class_name}.{node.name}" if class_name else node.name)
+        file_key = sys.intern(str(file_path))
+        full_key = (file_key, qualified_name)
 
         if full_key in self._visited:
             return
         self._visited.add(full_key)
 
-        # Extrai o código da função
-        lines = source.splitlines()
-        code = "\n".join(lines[node.lineno - 1 : node.end_lineno or node.lineno])
-
-        # Encontra chamadas de função
-        calls = self._find_calls(node)
-        imports = self._find_imports_used(node, file_path)
+        # Encontra chamadas de função e imports usados
+        calls, used_names = self._scan_node(node)
+        imports = self._find_imports_used(used_names, file_path)
 
         chunk = CodeChunk(
             name=qualified_name,
-            code=code,
-            file_path=str(file_path),
+            file_path=file_key,
             line_start=node.lineno,
             line_end=node.end_lineno or node.lineno,
             chunk_type="method" if class_name else "function",
-            docstring=ast.get_docstring(node),
+            docstring=ast.get_docstring(node) if self.include_docstrings else None,
             calls=calls,
             imports=imports,
+            source=source,
+            line_offsets=self._get_line_offsets(file_path, source),
         )
 
         self._collected[full_key] = chunk
@@ -692,30 +1144,29 @@ class CodeCollector:
         source: str,
     ) -> None:
         """Coleta uma classe e seus métodos."""
-        full_key = f"{file_path}:{node.name}"
+        file_key = sys.intern(str(file_path))
+        class_name = sys.intern(node.name)
+        full_key = (file_key, class_name)
 
         if full_key in self._visited:
             return
         self._visited.add(full_key)
 
-        # Extrai o código da classe
-        lines = source.splitlines()
-        code = "\n".join(lines[node.lineno - 1 : node.end_lineno or node.lineno])
-
-        # Encontra chamadas de função
-        calls = self._find_calls(node)
-        imports = self._find_imports_used(node, file_path)
+        # Encontra chamadas de função e imports usados
+        calls, used_names = self._scan_node(node)
+        imports = self._find_imports_used(used_names, file_path)
 
         chunk = CodeChunk(
-            name=node.name,
-            code=code,
-            file_path=str(file_path),
+            name=class_name,
+            file_path=file_key,
             line_start=node.lineno,
             line_end=node.end_lineno or node.lineno,
             chunk_type="class",
-            docstring=ast.get_docstring(node),
+            docstring=ast.get_docstring(node) if self.include_docstrings else None,
             calls=calls,
             imports=imports,
+            source=source,
+            line_offsets=self._get_line_offsets(file_path, source),
         )
 
         self._collected[full_key] = chunk
@@ -723,106 +1174,263 @@ class CodeCollector:
         # Segue as chamadas para funções locais
         self._follow_calls(calls, file_path)
 
-    def _find_calls(self, node: ast.AST) -> list[str]:
-        """Encontra todas as chamadas de função em um nó."""
-        calls = []
-        for child in ast.walk(node):
-            if isinstance(child, ast.Call):
-                call_name = self._get_call_name(child)
-                if call_name:
-                    calls.append(call_name)
-        return list(set(calls))
-
-    def _get_call_name(self, node: ast.Call) -> str | None:
-        """Extrai o nome de uma chamada de função."""
-        if isinstance(node.func, ast.Name):
-            return node.func.id
-        elif isinstance(node.func, ast.Attribute):
-            parts = []
-            current = node.func
-            while isinstance(current, ast.Attribute):
-                parts.append(current.attr)
-                current = current.value
-            if isinstance(current, ast.Name):
-                parts.append(current.id)
-            return ".".join(reversed(parts))
-        return None
+    def _scan_node(self, node: ast.AST) -> tuple[list[str], set[str]]:
+        """
+        Encontra as chamadas de função e os nomes usados em um nó.
 
-    def _find_imports_used(self, node: ast.AST, file_path: Path) -> list[str]:
-        """Encontra imports usados em um nó."""
-        imports = []
-        tree = self._ast_cache.get(str(file_path))
-        if not tree:
-            return imports
-
-        # Coleta nomes usados no nó
-        used_names = set()
-        for child in ast.walk(node):
-            if isinstance(child, ast.Name):
+        Faz uma única travessia com pilha explícita para ambos. Os filhos são
+        lidos direto de `_fields` (sem o gerador de ast.iter_child_nodes) e
+        nós Name não são expandidos, o que é ~3x mais rápido que ast.walk.
+        Os filhos são empilhados em ordem reversa, então as chamadas saem na
+        ordem em que aparecem no código. As chamadas vão direto para um dict
+        (conjunto ordenado), sem lista intermediária, e o nome de cada chamada
+        é montado no próprio laço.
+
+        Returns:
+            Tupla (chamadas sem repetição, em ordem de código; nomes usados)
+        """
+        calls: dict[str, None] = {}
+        used_names: set[str] = set()
+        stack = [node]
+        pop = stack.pop
+        push = stack.append
+        # Classes em variáveis locais: evita a busca global + atributo por nó
+        Name, Call, Attribute, AST = ast.Name, ast.Call, ast.Attribute, ast.AST
+        while stack:
+            child = pop()
+            child_type = type(child)
+            if child_type is Name:
                 used_names.add(child.id)
+                continue
+            if child_type is Call:
+                # Nome da chamada: func, obj.func, obj.attr.func...
+                func = child.func
+                func_type = type(func)
+                if func_type is Name:
+                    calls[func.id] = None
+                elif func_type is Attribute:
+                    # Monta o nome de trás para frente, sem listas intermediárias
+                    call_name = func.attr
+                    current = func.value
+                    while type(current) is Attribute:
+                        call_name = f"{current.attr}.{call_name}"
+                        current = current.value
+                    if type(current) is Name:
+                        call_name = f"{current.id}.{call_name}"
+                    calls[call_name] = None
+            for field_name in reversed(child._fields):
+                # ctx (Load/Store/Del) nunca tem filhos
+                if field_name == "ctx":
+                    continue
+                value = getattr(child, field_name, None)
+                if isinstance(value, AST):
+                    push(value)
+                elif type(value) is list:
+                    for item in reversed(value):
+                        if isinstance(item, AST):
+                            push(item)
+        return list(calls), used_names
+
+    def _find_imports_used(self, used_names: set[str], file_path: Path) -> list[str]:
+        """Encontra os imports do arquivo correspondentes aos nomes usados em um nó."""
+        index = self._get_import_index(file_path)
+        hits = [hit for name in used_names if name in index for hit in index[name]]
+        # Na ordem em que os imports aparecem no arquivo
+        hits.sort()
+        return [full_name for _, full_name in hits]
+
+    def _get_import_index(self, file_path: Path) -> dict[str, list[tuple[int, str]]]:
+        """
+        Retorna (e cacheia) os imports de nível superior de um arquivo por nome local.
 
-        # Verifica quais imports correspondem
-        for tree_node in tree.body:
-            if isinstance(tree_node, ast.Import):
-                for alias in tree_node.names:
-                    name = alias.asname or alias.name.split(".")[0]
-                    if name in used_names:
-                        imports.append(alias.name)
-            elif isinstance(tree_node, ast.ImportFrom):
-                for alias in tree_node.names:
-                    name = alias.asname or alias.name
-                    if name in used_names:
-                        module = tree_node.module or ""
-                        imports.append(f"{module}.{alias.name}" if module else alias.name)
-
-        return imports
+        Cada nome local aponta para (posição do import no arquivo, nome completo).
+        """
+        key = str(file_path)
+        index = self._import_index.get(key)
+        if index is not None:
+            return index
+
+        index = {}
+        tree = self._ast_cache.get(key)
+        if tree:
+            position = 0
+            for tree_node in tree.body:
+                node_type = type(tree_node)
+                if node_type is ast.Import:
+                    for alias in tree_node.names:
+                        name = alias.asname or alias.name.split(".")[0]
+                        index.setdefault(name, []).append((position, alias.name))
+                        position += 1
+                elif node_type is ast.ImportFrom:
+                    module = tree_node.module or ""
+                    for alias in tree_node.names:
+                        name = alias.asname or alias.name
+                        full_name = f"{module}.{alias.name}" if module else alias.name
+                        index.setdefault(name, []).append((position, full_name))
+                        position += 1
+            self._import_index[key] = index
+
+        return index
 
     def _follow_calls(self, calls: list[str], current_file: Path) -> None:
         """Segue chamadas de função para outros arquivos/funções."""
+        file_key = str(current_file)
+        source = self._file_cache.get(file_key)
+        symbols = self._symbol_index.get(file_key, {})
+
         for call in calls:
+            # Já foi seguida (ou falhou) e nenhum import novo foi registrado desde
+            # então: os destinos seriam os mesmos, todos já visitados
+            generation = self._import_generation
+            call_key = (file_key, call)
+            if (
+                self._resolved_calls.get(call_key) == generation
+                or self._unresolved_calls.get(call_key) == generation
+            ):
+                continue
+            resolved = False
+
             # Verifica se é um import local
             parts = call.split(".")
 
             # Busca no arquivo atual primeiro
-            source = self._file_cache.get(str(current_file))
-            tree = self._ast_cache.get(str(current_file))
-
-            if tree and source:
-                for node in tree.body:
-                    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                        if node.name == parts[0]:
-                            self._collect_function(node, current_file, source)
-                    elif isinstance(node, ast.ClassDef):
-                        if node.name == parts[0]:
-                            self._collect_class(node, current_file, source)
-
-            # Tenta seguir imports
-            for import_name, import_path in self._import_map.items():
-                if parts[0] in import_name or import_name.endswith(f".{parts[0]}"):
-                    if isinstance(import_path, Path) and import_path.is_file():
-                        try:
-                            imp_source = self._read_file(import_path)
-                            imp_tree = self._parse_file(import_path, imp_source)
-                            self._collect_imports(imp_tree, import_path)
-
-                            for node in imp_tree.body:
-                                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                                    if node.name == parts[-1]:
-                                        self._collect_function(node, import_path, imp_source)
-                                elif isinstance(node, ast.ClassDef):
-                                    if node.name == parts[-1]:
-                                        self._collect_class(node, import_path, imp_source)
-                        except Exception:
-                            pass
+            node = symbols.get(parts[0])
+            if node is not None and source:
+                resolved = True
+                if (file_key, parts[0]) not in self._visited:
+                    self._collect_symbol(node, current_file, source)
+
+            # Tenta seguir imports (cópia: seguir um import pode registrar outros)
+            for import_name in list(self._import_segment_index.get(parts[0], ())):
+                import_path = self._import_map[import_name]
+                if not isinstance(import_path, Path):
+                    continue
+                imp_key = str(import_path)
+                target_key = (imp_key, parts[-1])
+                # Símbolo já coletado de um arquivo já processado: nada a ler
+                if target_key in self._visited and imp_key in self._imports_collected:
+                    resolved = True
+                    continue
+                if not self._is_file(import_path):
+                    continue
+                try:
+                    imp_source = self._read_file(import_path)
+                    if self._can_skip_parse(imp_key, imp_source, parts[-1]):
+                        continue
+                    imp_tree = self._parse_file(import_path, imp_source)
+                    if imp_key not in self._imports_collected:
+                        self._imports_collected.add(imp_key)
+                        self._collect_imports(imp_tree, import_path)
+
+                    node = self._symbol_index[imp_key].get(parts[-1])
+                    if node is not None:
+                        resolved = True
+                        if target_key not in self._visited:
+                            self._collect_symbol(node, import_path, imp_source)
+                except Exception:
+                    pass
+
+            if resolved:
+                self._resolved_calls[call_key] = generation
+            else:
+                self._unresolved_calls[call_key] = generation
+
+    def _can_skip_parse(self, key: str, source: str, name: str) -> bool:
+        """
+        Verifica, sem parsear, se um arquivo importado não tem nada a oferecer.
+
+        Um arquivo ainda não parseado pode ser ignorado quando não define `name`
+        no nível superior e não contém imports (que precisariam ser registrados).
+        """
+        if key in self._ast_cache:
+            return False
+
+        scanned = self._top_level_names.get(key)
+        if scanned is None:
+            scanned = (frozenset(TOP_DEF.findall(source)), HAS_IMPORT.search(source) is not None)
+            self._top_level_names[key] = scanned
+
+        names, has_imports = scanned
+        return not has_imports and name not in names
+
+    def _collect_symbol(self, node: ast.stmt, file_path: Path, source: str) -> None:
+        """Coleta uma função ou classe de nível superior."""
+        if type(node) is ast.ClassDef:
+            self._collect_class(node, file_path, source)
+        else:
+            self._collect_function(node, file_path, source)
 
     def _order_chunks(self) -> list[CodeChunk]:
-        """Ordena chunks por dependência (chamadores primeiro)."""
-        # Por simplicidade, ordena por tipo e nome
-        chunks = list(self._collected.values())
+        """
+        Ordena chunks por dependência (chamadores primeiro).
+
+        Usa o algoritmo de Kahn sobre as chamadas de cada chunk. Empates seguem
+        a ordem por tipo e nome. Quando só restam chunks presos em ciclos, um
+        deles é liberado (de preferência um já chamado por chunks emitidos) e o
+        algoritmo continua, de modo que o que vem depois do ciclo ainda sai com
+        os chamadores primeiro.
+
+        Os chunks são numerados uma vez (na ordem por tipo e nome) e o grafo
+        trabalha sobre esses índices, em listas paralelas, em vez de chaves.
+        """
+        # Ordem por tipo e nome: separa por tipo e ordena cada grupo só pelo nome
+        type_order = CHUNK_TYPE_ORDER.get
+        unknown = len(CHUNK_TYPE_ORDER)
+        buckets: list[list[CodeChunk]] = [[] for _ in range(unknown + 1)]
+        for chunk in self._collected.values():
+            buckets[type_order(chunk.chunk_type, unknown)].append(chunk)
+        chunks: list[CodeChunk] = []
+        by_chunk_name = attrgetter("name")
+        for bucket in buckets:
+            bucket.sort(key=by_chunk_name)
+            chunks.extend(bucket)
+        count = len(chunks)
+
+        # Índices por nome (qualificado e simples) para resolver as chamadas
+        by_name: dict[str, list[int]] = {}
+        for index, chunk in enumerate(chunks):
+            name = chunk.name
+            by_name.setdefault(name, []).append(index)
+            short_name = name.rsplit(".", 1)[-1]
+            if short_name != name:
+                by_name.setdefault(short_name, []).append(index)
+
+        callees: list[list[int]] = []
+        in_degree = [0] * count
+        for index, chunk in enumerate(chunks):
+            targets: dict[int, None] = {}
+            for call in chunk.calls:
+                parts = call.split(".")
+                for name in (call, parts[0], parts[-1]):
+                    for target in by_name.get(name, ()):
+                        if target != index:
+                            targets[target] = None
+            callees.append(list(targets))
+            for target in targets:
+                in_degree[target] += 1
+
+        queue = deque(index for index in range(count) if in_degree[index] == 0)
+        ordered: list[int] = []
+        emitted = [False] * count
+        called = [False] * count  # Chamado por algum chunk já emitido
+        while True:
+            while queue:
+                index = queue.popleft()
+                emitted[index] = True
+                ordered.append(index)
+                for target in callees[index]:
+                    called[target] = True
+                    in_degree[target] -= 1
+                    if in_degree[target] == 0 and not emitted[target]:
+                        queue.append(target)
+
+            if len(ordered) == count:
+                break
 
-        def sort_key(c: CodeChunk) -> tuple[int, str]:
-            type_order = {"function": 0, "class": 1, "method": 2}
-            return (type_order.get(c.chunk_type, 3), c.name)
+            # Ciclo: libera o primeiro chunk restante (na ordem por tipo e nome)
+            remaining = [index for index in range(count) if not emitted[index]]
+            forced = next((index for index in remaining if called[index]), remaining[0])
+            in_degree[forced] = 0
+            queue.append(forced)
 
-        chunks.sort(key=sort_key)
-        return chunks
+        return [chunks[index] for index in ordered]
@@ -1,5 +1,7 @@
 """Modelos de dados para representação intermediária de código."""
 
+import sys
+from collections.abc import Iterator
 from dataclasses import dataclass, field
 from enum import Enum
 
@@ -17,7 +19,7 @@ class ElementType(str, Enum):
     COMPONENT = "component"  # React/Vue components
 
 
-@dataclass
+@dataclass(slots=True)
 class Parameter:
     """Representa um parâmetro de função/método."""
 
@@ -28,7 +30,7 @@ class Parameter:
     is_kwargs: bool = False  # **kwargs
 
 
-@dataclass
+@dataclass(slots=True)
 class FunctionCall:
     """Representa uma chamada de função."""
 
@@ -38,7 +40,7 @@ class FunctionCall:
     line_number: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
 class Import:
     """Representa um import."""
 
@@ -50,7 +52,7 @@ class Import:
     specifiers: list[dict[str, str]] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class APICall:
     """Representa uma chamada de API (fetch, axios, etc.)."""
 
@@ -60,9 +62,10 @@ class APICall:
     line_number: int = 0
     is_external: bool = False  # True se não encontrou endpoint no repo
     matched_endpoint: str | None = None  # Arquivo/função do endpoint encontrado
+    file_path: str = ""  # Arquivo onde a chamada aparece
 
 
-@dataclass
+@dataclass(slots=True)
 class CodeElement:
     """
     Representa um elemento de código (módulo, classe, função, etc).
@@ -102,6 +105,13 @@ class CodeElement:
     children: list["CodeElement"] = field(default_factory=list)
     parent: "CodeElement | None" = None
 
+    def __post_init__(self) -> None:
+        # Nomes e arquivos se repetem muito entre elementos: uma cópia só de cada
+        self.name = sys.intern(self.name)
+        self.source_file = sys.intern(self.source_file)
+        if self.return_type is not None:
+            self.return_type = sys.intern(self.return_type)
+
     def add_child(self, child: "CodeElement") -> "CodeElement":
         """Adiciona um elemento filho."""
         child.parent = self
@@ -110,50 +120,61 @@ class CodeElement:
 
     def get_qualified_name(self) -> str:
         """Retorna o nome qualificado do elemento (ex: MyClass.my_method)."""
-        if self.parent and self.parent.element_type != ElementType.MODULE:
-            return f"{self.parent.get_qualified_name()}.{self.name}"
-        return self.name
+        names = [self.name]
+        current = self.parent
+        while current is not None and current.element_type != ElementType.MODULE:
+            names.append(current.name)
+            current = current.parent
+        if len(names) == 1:
+            return self.name
+        names.reverse()
+        return ".".join(names)
+
+    def iter_descendants(self) -> Iterator["CodeElement"]:
+        """Percorre os descendentes em pré-ordem (pai antes dos filhos), sem recursão."""
+        stack = list(reversed(self.children))
+        while stack:
+            element = stack.pop()
+            yield element
+            stack.extend(reversed(element.children))
 
     def get_functions(self) -> list["CodeElement"]:
         """Retorna todas as funções/métodos deste elemento."""
-        result = []
-        for child in self.children:
-            if child.element_type in (ElementType.FUNCTION, ElementType.METHOD):
-                result.append(child)
-            result.extend(child.get_functions())
-        return result
+        return [
+            element
+            for element in self.iter_descendants()
+            if element.element_type in (ElementType.FUNCTION, ElementType.METHOD)
+        ]
 
     def get_classes(self) -> list["CodeElement"]:
         """Retorna todas as classes deste elemento."""
-        result = []
-        for child in self.children:
-            if child.element_type == ElementType.CLASS:
-                result.append(child)
-            result.extend(child.get_classes())
-        return result
+        return [
+            element
+            for element in self.iter_descendants()
+            if element.element_type == ElementType.CLASS
+        ]
 
     def find_element(self, name: str) -> "CodeElement | None":
-        """Busca um elemento pelo nome."""
+        """Busca um elemento pelo nome (o primeiro em pré-ordem)."""
         if self.name == name:
             return self
-        for child in self.children:
-            found = child.find_element(name)
-            if found:
-                return found
+        for element in self.iter_descendants():
+            if element.name == name:
+                return element
         return None
 
     def get_all_calls(self) -> list[FunctionCall]:
         """Retorna todas as chamadas de função deste elemento e filhos."""
         result = list(self.calls)
-        for child in self.children:
-            result.extend(child.get_all_calls())
+        for element in self.iter_descendants():
+            result.extend(element.calls)
         return result
 
     def get_all_api_calls(self) -> list[APICall]:
         """Retorna todas as chamadas de API deste elemento e filhos."""
         result = list(self.api_calls)
-        for child in self.children:
-            result.extend(child.get_all_api_calls())
+        for element in self.iter_descendants():
+            result.extend(element.api_calls)
         return result
 
     def to_markdown(self, include_params: bool = True) -> str:
@@ -212,7 +233,7 @@ class CodeElement:
         return "\n".join(lines)
 
 
-@dataclass
+@dataclass(slots=True)
 class CodeGraph:
     """
     Grafo de código representando relações entre elementos.
@@ -223,11 +244,14 @@ class CodeGraph:
     elements: dict[str, CodeElement] = field(default_factory=dict)
     # Mapa de chamadas: caller -> list[callee]
     call_graph: dict[str, list[str]] = field(default_factory=dict)
+    # Mapa reverso: callee -> list[caller] (na ordem do call_graph, sem repetição)
+    reverse_call_graph: dict[str, list[str]] = field(default_factory=dict)
 
     def build_indices(self) -> None:
-        """Constrói os índices de elementos e call graph."""
+        """Constrói os índices de elementos, call graph e call graph reverso."""
         self._index_element(self.root)
         self._build_call_graph(self.root)
+        self._build_reverse_call_graph()
 
     def _index_element(self, element: CodeElement) -> None:
         """Indexa um elemento e seus filhos."""
@@ -251,13 +275,16 @@ class CodeGraph:
         for child in element.children:
             self._build_call_graph(child)
 
+    def _build_reverse_call_graph(self) -> None:
+        """Inverte o grafo de chamadas (callee -> callers)."""
+        self.reverse_call_graph = {}
+        for caller, callees in self.call_graph.items():
+            for callee in dict.fromkeys(callees):
+                self.reverse_call_graph.setdefault(callee, []).append(caller)
+
     def get_callers(self, element_name: str) -> list[str]:
         """Retorna os elementos que chamam o elemento especificado."""
-        callers = []
-        for caller, callees in self.call_graph.items():
-            if element_name in callees:
-                callers.append(caller)
-        return callers
+        return self.reverse_call_graph.get(element_name, [])
 
     def get_callees(self, element_name: str) -> list[str]:
         """Retorna os elementos chamados pelo elemento especificado."""
@@ -1,12 +1,55 @@
 """Scanner para encontrar endpoints FastAPI em um repositório."""
 
 import ast
+import functools
+import os
 import re
+import sys
+from collections.abc import Iterator
 from dataclasses import dataclass, field
 from pathlib import Path
 
+from lerigou.processor.ast_cache import AstDiskCache
+from lerigou.processor.ast_walk import iter_statements
 
-@dataclass
+# Placeholder de path parameter: {user_id}
+PLACEHOLDER_RE = re.compile(r"\{[^}]+\}")
+
+# Linha de decorator que chama um método HTTP: @router.get(, @app.post (...
+ROUTE_DECORATOR_RE = re.compile(
+    rb"@[^\n]*\.[ \t]*(?:get|post|put|patch|delete|head|options|trace)[ \t)]*\(",
+    re.IGNORECASE,
+)
+
+# Prefixos comuns de API ignorados ao comparar paths
+API_PREFIXES = ("api/", "api/v1/", "api/v2/")
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_path_pattern(endpoint_path: str) -> re.Pattern[str]:
+    """Converte um path de endpoint em regex (/users/{user_id} -> ^users/[^/]+$)."""
+    return re.compile(f"^{PLACEHOLDER_RE.sub(r'[^/]+', endpoint_path)}$")
+
+
+@functools.lru_cache(maxsize=1024)
+def _prepare_request_path(request_path: str) -> tuple[str, str, tuple[tuple[str, str], ...]]:
+    """
+    Prepara um path de requisição para comparar com os endpoints.
+
+    Returns:
+        Tupla (path sem barras nas pontas, path com placeholders normalizados,
+        pares (prefixo de API, path sem o prefixo) para os prefixos presentes)
+    """
+    request_path = request_path.strip("/")
+    stripped = tuple(
+        (prefix, request_path[len(prefix) :])
+        for prefix in API_PREFIXES
+        if request_path.startswith(prefix)
+    )
+    return request_path, PLACEHOLDER_RE.sub("{param}", request_path), stripped
+
+
+@dataclass(slots=True)
 class EndpointInfo:
     """Informações sobre um endpoint FastAPI."""
 
@@ -18,6 +61,17 @@ class EndpointInfo:
     router_prefix: str = ""  # Prefixo do router (ex: /api/v1)
     decorators: list[str] = field(default_factory=list)
     docstring: str | None = None
+    # (router_prefix, path, path normalizado, regex, regex por prefixo de API),
+    # calculado no primeiro matches_path e refeito se o prefixo do router mudar
+    _match_data: tuple[str, str, str, re.Pattern[str], dict[str, re.Pattern[str]]] | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self) -> None:
+        # Método, arquivo e prefixo se repetem entre endpoints: uma cópia só de cada
+        self.method = sys.intern(self.method)
+        self.file_path = sys.intern(self.file_path)
+        self.router_prefix = sys.intern(self.router_prefix)
 
     @property
     def full_path(self) -> str:
@@ -28,42 +82,109 @@ class EndpointInfo:
 
     def matches_path(self, request_path: str) -> bool:
         """Verifica se o endpoint corresponde a um path de requisição."""
-        # Normaliza os paths
-        endpoint_path = self.full_path.strip("/")
-        request_path = request_path.strip("/")
-        
-        endpoint_norm = self._normalize_placeholder_path(endpoint_path)
-        request_norm = self._normalize_placeholder_path(request_path)
+        request_path, request_norm, request_stripped = _prepare_request_path(request_path)
+        _, _, endpoint_norm, pattern, stripped_patterns = self._get_match_data()
+
+        # Paths iguais a menos do nome dos placeholders
         if endpoint_norm == request_norm:
             return True
 
-        # Converte path parameters para regex
-        # /users/{user_id} -> /users/[^/]+
-        pattern = re.sub(r"\{[^}]+\}", r"[^/]+", endpoint_path)
-        pattern = f"^{pattern}$"
-
-        # Tenta match direto
-        if re.match(pattern, request_path):
+        # Tenta match direto, com os path parameters convertidos em regex
+        if pattern.match(request_path):
             return True
 
-        # Tenta removendo prefixos comuns de API do request
-        for prefix in ["api/", "api/v1/", "api/v2/"]:
-            if request_path.startswith(prefix):
-                clean_path = request_path[len(prefix) :]
-                clean_endpoint = endpoint_path
-                # Remove o mesmo prefixo do endpoint se existir
-                if clean_endpoint.startswith(prefix):
-                    clean_endpoint = clean_endpoint[len(prefix) :]
-                clean_pattern = re.sub(r"\{[^}]+\}", r"[^/]+", clean_endpoint)
-                clean_pattern = f"^{clean_pattern}$"
-                if re.match(clean_pattern, clean_path):
-                    return True
+        # Tenta removendo prefixos comuns de API do request (e do endpoint, se tiver)
+        for prefix, clean_path in request_stripped:
+            if stripped_patterns[prefix].match(clean_path):
+                return True
 
         return False
 
-    def _normalize_placeholder_path(self, path: str) -> str:
-        """Substitui placeholders {param} por um valor genérico para comparar."""
-        return re.sub(r"\{[^}]+\}", "{param}", path)
+    def _get_match_data(
+        self,
+    ) -> tuple[str, str, str, re.Pattern[str], dict[str, re.Pattern[str]]]:
+        """Retorna (e cacheia) o que matches_path precisa do lado do endpoint."""
+        data = self._match_data
+        if data is None or data[0] != self.router_prefix or data[1] != self.path:
+            endpoint_path = self.full_path.strip("/")
+            stripped_patterns = {
+                prefix: _compile_path_pattern(
+                    endpoint_path[len(prefix) :]
+                    if endpoint_path.startswith(prefix)
+                    else endpoint_path
+                )
+                for prefix in API_PREFIXES
+            }
+            data = (
+                self.router_prefix,
+                self.path,
+                PLACEHOLDER_RE.sub("{param}", endpoint_path),
+                _compile_path_pattern(endpoint_path),
+                stripped_patterns,
+            )
+            self._match_data = data
+        return data
+
+
+@dataclass(slots=True)
+class FileScan:
+    """Resultado do scan de um arquivo, ainda sem os prefixos globais aplicados."""
+
+    # ("router", nome, prefixo) para APIRouter e ("include", nome, prefixo) para
+    # include_router, na ordem do arquivo
+    router_ops: list[tuple[str, str, str]] = field(default_factory=list)
+    local_routers: dict[str, str] = field(default_factory=dict)
+    # Endpoints com o nome do objeto decorador (app, router...)
+    endpoints: list[tuple[EndpointInfo, str | None]] = field(default_factory=list)
+
+
+def _iter_python_files(directory: Path) -> Iterator[Path]:
+    """
+    Percorre um diretório como rglob("*.py").
+
+    Usa um os.scandir por diretório; os arquivos de um diretório vêm antes dos
+    subdiretórios, que são visitados em profundidade (links simbólicos para
+    diretórios não são seguidos, como no rglob).
+    """
+    subdirs: list[Path] = []
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                try:
+                    if entry.name.endswith(".py") and entry.is_file():
+                        yield Path(entry.path)
+                    elif entry.is_dir() and not entry.is_symlink():
+                        subdirs.append(Path(entry.path))
+                except OSError:
+                    continue
+    except OSError:
+        return
+
+    for subdir in subdirs:
+        yield from _iter_python_files(subdir)
+
+
+def _may_declare_routes(source: bytes) -> bool:
+    """
+    Verifica, sem parsear, se um arquivo pode ter routers ou endpoints.
+
+    Routers precisam de APIRouter, prefixos de include_router e endpoints de
+    um decorator de método HTTP; arquivos sem nenhum deles não produzem nada
+    no scan. Não dá para exigir um import de fastapi: módulos de rotas
+    costumam importar o router de outro módulo do projeto.
+    """
+    if b"APIRouter" in source or b"include_router" in source:
+        return True
+    return b"@" in source and ROUTE_DECORATOR_RE.search(source) is not None
+
+
+def _scan_source(disk_cache: AstDiskCache, source: bytes, file_path: str) -> FileScan | None:
+    """Parseia (com o cache em disco) e escaneia um arquivo."""
+    try:
+        tree = disk_cache.parse(source, file_path)
+    except (SyntaxError, ValueError):
+        return None
+    return FastAPIScanner._scan_tree(tree, file_path)
 
 
 class FastAPIScanner:
@@ -79,10 +200,13 @@ class FastAPIScanner:
 
     HTTP_METHODS = {"get", "post", "put", "patch", "delete", "head", "options", "trace"}
 
-    def __init__(self):
+    def __init__(self, cache_dir: Path | None = None):
         self._endpoints: dict[str, EndpointInfo] = {}
+        # método -> (chave -> endpoint), na mesma ordem de _endpoints
+        self._endpoints_by_method: dict[str, dict[str, EndpointInfo]] = {}
         self._router_prefixes: dict[str, str] = {}  # router_name -> prefix
         self._file_routers: dict[str, list[str]] = {}  # file -> router names
+        self._disk_cache = AstDiskCache(cache_dir)
 
     def scan_repository(self, repo_path: Path) -> dict[str, EndpointInfo]:
         """
@@ -95,83 +219,109 @@ class FastAPIScanner:
             Dicionário de path -> EndpointInfo
         """
         self._endpoints = {}
+        self._endpoints_by_method = {}
         self._router_prefixes = {}
 
-        # Encontra todos os arquivos Python
-        python_files = list(repo_path.rglob("*.py"))
-
-        # Primeira passada: encontra definições de routers e seus prefixos
-        for file_path in python_files:
-            self._scan_router_definitions(file_path)
+        # Passada única: routers (globais e locais) e endpoints pendentes
+        pending: list[tuple[EndpointInfo, str | None, dict[str, str]]] = []
+        for scan in self._scan_files(list(_iter_python_files(repo_path))):
+            if scan is None:
+                continue
+            self._apply_router_ops(scan.router_ops)
+            pending.extend(
+                (endpoint, obj_name, scan.local_routers) for endpoint, obj_name in scan.endpoints
+            )
 
-        # Segunda passada: encontra endpoints
-        for file_path in python_files:
-            self._scan_endpoints(file_path)
+        # Resolve os prefixos agora que todos os routers são conhecidos
+        for endpoint, obj_name, local_routers in pending:
+            endpoint.router_prefix = sys.intern(
+                self._resolve_router_prefix(obj_name, local_routers)
+            )
+            key = f"{endpoint.method}:{endpoint.full_path}"
+            self._endpoints[key] = endpoint
+            self._endpoints_by_method.setdefault(endpoint.method, {})[key] = endpoint
 
         return self._endpoints
 
-    def _scan_router_definitions(self, file_path: Path) -> None:
-        """Escaneia um arquivo procurando definições de APIRouter."""
-        try:
-            source = file_path.read_text(encoding="utf-8")
-            tree = ast.parse(source, filename=str(file_path))
-        except (SyntaxError, UnicodeDecodeError):
-            return
+    def _scan_files(self, files: list[Path]) -> list[FileScan | None]:
+        """
+        Escaneia os arquivos, na ordem recebida (None para os ilegíveis/inválidos).
+
+        Arquivos que não podem declarar rotas (ver _may_declare_routes) nem são
+        parseados.
+        """
+        results: list[FileScan | None] = []
+        for file_path in files:
+            try:
+                # O parser recebe os bytes direto (decodifica UTF-8 e traduz quebras de linha)
+                source = file_path.read_bytes()
+            except OSError:
+                results.append(None)
+                continue
+            if source and _may_declare_routes(source):
+                results.append(_scan_source(self._disk_cache, source, str(file_path)))
+            else:
+                results.append(None)
+
+        return results
+
+    def _apply_router_ops(self, router_ops: list[tuple[str, str, str]]) -> None:
+        """Aplica os routers e include_router de um arquivo aos prefixos globais."""
+        for kind, router_name, prefix in router_ops:
+            if kind == "router":
+                self._router_prefixes[router_name] = prefix
+            else:
+                existing = self._router_prefixes.get(router_name, "")
+                self._router_prefixes[router_name] = prefix + existing
+
+    @staticmethod
+    def _scan_tree(tree: ast.Module, file_path: str) -> FileScan:
+        """
+        Escaneia a AST de um arquivo procurando routers e endpoints.
 
-        for node in ast.walk(tree):
+        Não altera o scanner: os prefixos de APIRouter e include_router voltam
+        como operações, aplicadas na ordem dos arquivos, e os endpoints voltam
+        com o objeto do decorator, para resolver o prefixo no fim do scan.
+        """
+        scan = FileScan()
+
+        # Routers, include_router e endpoints são sempre statements
+        for node in iter_statements(tree):
+            node_type = type(node)
             # Procura por: router = APIRouter(prefix="/api")
-            if isinstance(node, ast.Assign):
+            if node_type is ast.Assign:
                 for target in node.targets:
                     if isinstance(target, ast.Name) and isinstance(node.value, ast.Call):
-                        if self._is_api_router_call(node.value):
-                            prefix = self._extract_prefix_from_router(node.value)
-                            self._router_prefixes[target.id] = prefix
+                        if FastAPIScanner._is_api_router_call(node.value):
+                            prefix = FastAPIScanner._extract_prefix_from_router(node.value)
+                            scan.router_ops.append(("router", target.id, prefix))
+                            scan.local_routers[target.id] = prefix
 
             # Procura por: app.include_router(router, prefix="/api")
-            if isinstance(node, ast.Expr) and isinstance(node.value, ast.Call):
+            elif node_type is ast.Expr and type(node.value) is ast.Call:
                 call = node.value
-                if self._is_include_router_call(call):
-                    router_name, prefix = self._extract_include_router_info(call)
+                if FastAPIScanner._is_include_router_call(call):
+                    router_name, prefix = FastAPIScanner._extract_include_router_info(call)
                     if router_name:
-                        existing = self._router_prefixes.get(router_name, "")
-                        self._router_prefixes[router_name] = prefix + existing
-
-    def _scan_endpoints(self, file_path: Path) -> None:
-        """Escaneia um arquivo procurando decorators de endpoint."""
-        try:
-            source = file_path.read_text(encoding="utf-8")
-            tree = ast.parse(source, filename=str(file_path))
-        except (SyntaxError, UnicodeDecodeError):
-            return
-
-        # Encontra os nomes de routers usados neste arquivo
-        local_routers = self._find_local_routers(tree)
-
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                        scan.router_ops.append(("include", router_name, prefix))
+
+            # Procura por: @router.get("/path")
+            elif node_type is ast.FunctionDef or node_type is ast.AsyncFunctionDef:
                 for decorator in node.decorator_list:
-                    endpoint = self._parse_endpoint_decorator(
-                        decorator, node, str(file_path), local_routers
-                    )
-                    if endpoint:
-                        key = f"{endpoint.method}:{endpoint.full_path}"
-                        self._endpoints[key] = endpoint
-
-    def _find_local_routers(self, tree: ast.Module) -> dict[str, str]:
-        """Encontra routers definidos localmente no arquivo."""
-        local_routers: dict[str, str] = {}
-
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Assign):
-                for target in node.targets:
-                    if isinstance(target, ast.Name) and isinstance(node.value, ast.Call):
-                        if self._is_api_router_call(node.value):
-                            prefix = self._extract_prefix_from_router(node.value)
-                            local_routers[target.id] = prefix
+                    parsed = FastAPIScanner._parse_endpoint_decorator(decorator, node, file_path)
+                    if parsed:
+                        scan.endpoints.append(parsed)
+
+        return scan
 
-        return local_routers
+    def _resolve_router_prefix(self, obj_name: str | None, local_routers: dict[str, str]) -> str:
+        """Determina o prefixo do router de um endpoint (locais primeiro, depois globais)."""
+        if not obj_name:
+            return ""
+        return local_routers.get(obj_name, "") or self._router_prefixes.get(obj_name, "")
 
-    def _is_api_router_call(self, call: ast.Call) -> bool:
+    @staticmethod
+    def _is_api_router_call(call: ast.Call) -> bool:
         """Verifica se é uma chamada APIRouter()."""
         if isinstance(call.func, ast.Name):
             return call.func.id == "APIRouter"
@@ -179,13 +329,15 @@ class FastAPIScanner:
             return call.func.attr == "APIRouter"
         return False
 
-    def _is_include_router_call(self, call: ast.Call) -> bool:
+    @staticmethod
+    def _is_include_router_call(call: ast.Call) -> bool:
         """Verifica se é uma chamada include_router()."""
         if isinstance(call.func, ast.Attribute):
             return call.func.attr == "include_router"
         return False
 
-    def _extract_prefix_from_router(self, call: ast.Call) -> str:
+    @staticmethod
+    def _extract_prefix_from_router(call: ast.Call) -> str:
         """Extrai o prefixo de uma chamada APIRouter()."""
         # Procura por prefix="..." nos kwargs
         for keyword in call.keywords:
@@ -193,7 +345,8 @@ class FastAPIScanner:
                 return str(keyword.value.value)
         return ""
 
-    def _extract_include_router_info(self, call: ast.Call) -> tuple[str | None, str]:
+    @staticmethod
+    def _extract_include_router_info(call: ast.Call) -> tuple[str | None, str]:
         """Extrai informações de include_router()."""
         router_name = None
         prefix = ""
@@ -209,50 +362,48 @@ class FastAPIScanner:
 
         return router_name, prefix
 
+    @staticmethod
     def _parse_endpoint_decorator(
-        self,
         decorator: ast.expr,
         func: ast.FunctionDef | ast.AsyncFunctionDef,
         file_path: str,
-        local_routers: dict[str, str],
-    ) -> EndpointInfo | None:
-        """Parseia um decorator de endpoint."""
-        if not isinstance(decorator, ast.Call):
+    ) -> tuple[EndpointInfo, str | None] | None:
+        """
+        Parseia um decorator de endpoint.
+
+        Retorna o endpoint (ainda sem prefixo de router) e o nome do objeto
+        decorador (app, router...), usado depois para resolver o prefixo.
+        """
+        if type(decorator) is not ast.Call:
             return None
 
         # @app.get("/path") ou @router.get("/path")
-        if isinstance(decorator.func, ast.Attribute):
-            method = decorator.func.attr.lower()
-            if method not in self.HTTP_METHODS:
+        target = decorator.func
+        if type(target) is ast.Attribute:
+            method = target.attr.lower()
+            if method not in FastAPIScanner.HTTP_METHODS:
                 return None
 
             # Identifica o objeto (app ou router)
             obj_name = None
-            if isinstance(decorator.func.value, ast.Name):
-                obj_name = decorator.func.value.id
+            if type(target.value) is ast.Name:
+                obj_name = target.value.id
 
             # Extrai o path do primeiro argumento
             path = "/"
-            if decorator.args and isinstance(decorator.args[0], ast.Constant):
-                path = str(decorator.args[0].value)
-
-            # Determina o prefixo do router
-            router_prefix = ""
-            if obj_name:
-                # Primeiro tenta routers locais, depois globais
-                router_prefix = local_routers.get(obj_name, "")
-                if not router_prefix:
-                    router_prefix = self._router_prefixes.get(obj_name, "")
-
-            return EndpointInfo(
+            args = decorator.args
+            if args and type(args[0]) is ast.Constant:
+                path = str(args[0].value)
+
+            endpoint = EndpointInfo(
                 path=path,
                 method=method.upper(),
                 function_name=func.name,
                 file_path=file_path,
                 line_number=func.lineno,
-                router_prefix=router_prefix,
                 docstring=ast.get_docstring(func),
             )
+            return endpoint, obj_name
 
         return None
 
@@ -274,9 +425,9 @@ class FastAPIScanner:
         if key in self._endpoints:
             return self._endpoints[key]
 
-        # Tenta match com path parameters
-        for endpoint in self._endpoints.values():
-            if endpoint.method == method and endpoint.matches_path(path):
+        # Tenta match com path parameters, só entre endpoints do mesmo método
+        for endpoint in self._endpoints_by_method.get(method, {}).values():
+            if endpoint.matches_path(path):
                 return endpoint
 
         return None
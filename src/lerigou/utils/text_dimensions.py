@@ -1,9 +1,14 @@
 """Utilitários para cálculo de dimensões de texto em nodes."""
 
 import re
+import unicodedata
+from collections.abc import Callable
+from functools import lru_cache
 
 # Configurações de renderização (valores aproximados para Obsidian Canvas)
 CHAR_WIDTH = 8  # Largura média de caractere em pixels
+NARROW_CHAR_WIDTH = 5  # Largura de caracteres estreitos (i, l, pontuação...)
+WIDE_CHAR_WIDTH = 11  # Largura de caracteres largos (m, w, M, W...)
 LINE_HEIGHT = 24  # Altura de uma linha normal
 HEADER_LINE_HEIGHT = 32  # Altura de uma linha com ### header
 CODE_LINE_HEIGHT = 22  # Altura de linha em code block
@@ -13,6 +18,36 @@ MIN_WIDTH = 150
 MIN_HEIGHT = 50
 MAX_WIDTH = 500
 
+# Caracteres ASCII mais estreitos/largos que a média na fonte proporcional;
+# as tabelas removem esses caracteres (str.translate) para contá-los em C
+NARROW_CHARS = "iljtfrI.,:;'|!`()[]"
+WIDE_CHARS = "mwMW@%"
+_DELETE_NARROW = str.maketrans("", "", NARROW_CHARS)
+_DELETE_WIDE = str.maketrans("", "", WIDE_CHARS)
+
+# Padding total (dos dois lados), usado em todo cálculo
+PADDING_HORIZONTAL_TOTAL = PADDING_HORIZONTAL * 2
+PADDING_VERTICAL_TOTAL = PADDING_VERTICAL * 2
+
+# Links markdown removidos para medir o texto visual (bold, italic e code
+# inline são removidos com str.find, ver _unwrap_delimited)
+LINK_RE = re.compile(r"\[(.+?)\]\(.+?\)")
+
+# Prefixo de linha -> (altura, fator de largura, largura extra); os prefixos são
+# testados do mais longo para o mais curto (line[:3], line[:2], line[:1])
+LINE_PREFIXES: dict[str, tuple[int, float, int]] = {
+    "###": (HEADER_LINE_HEIGHT + 4, 1.1, 0),  # Headers são um pouco maiores
+    "##": (HEADER_LINE_HEIGHT + 8, 1.2, 0),
+    "#": (HEADER_LINE_HEIGHT + 12, 1.3, 0),
+    "```": (CODE_LINE_HEIGHT, 0.9, 0),  # Fonte monospace é mais estreita
+    "`": (CODE_LINE_HEIGHT, 0.9, 0),
+    "- ": (LINE_HEIGHT, 1.0, 16),  # Espaço para bullet
+    "• ": (LINE_HEIGHT, 1.0, 16),
+}
+
+# Nodes memorizados em calculate_node_dimensions: canvases repetem muitos textos
+DIMENSIONS_CACHE_SIZE = 4096
+
 
 def calculate_text_dimensions(
     text: str,
@@ -35,23 +70,25 @@ def calculate_text_dimensions(
     if not text:
         return (min_width, min_height)
 
-    lines = text.split("\n")
-    total_height = PADDING_VERTICAL * 2
+    # Acumula largura máxima e altura total sem guardar as dimensões de cada linha.
+    # Este laço é mais rápido que max()/sum() sobre geradores (duas passadas mais
+    # os frames dos geradores) e que zip(*...)
     max_line_width = 0
-
-    for line in lines:
-        line_width, line_height = _calculate_line_dimensions(line)
-        max_line_width = max(max_line_width, line_width)
+    total_height = PADDING_VERTICAL_TOTAL
+    for line_width, line_height in map(_calculate_line_dimensions, text.split("\n")):
+        if line_width > max_line_width:
+            max_line_width = line_width
         total_height += line_height
 
     # Calcula largura final
-    width = max_line_width + PADDING_HORIZONTAL * 2
-    width = max(min_width, min(max_width, width))
+    width = max_line_width + PADDING_HORIZONTAL_TOTAL
+    width = _clamp(width, min_width, max_width)
 
     # Se o texto é muito largo, precisa de mais altura para wrap
-    if max_line_width > max_width - PADDING_HORIZONTAL * 2:
+    inner_max_width = max_width - PADDING_HORIZONTAL_TOTAL
+    if max_line_width > inner_max_width:
         # Estima linhas extras por wrap
-        wrap_factor = max_line_width / (max_width - PADDING_HORIZONTAL * 2)
+        wrap_factor = max_line_width / inner_max_width
         total_height = int(total_height * wrap_factor * 0.8)  # 0.8 para não exagerar
 
     height = max(min_height, total_height)
@@ -66,56 +103,143 @@ def _calculate_line_dimensions(line: str) -> tuple[int, int]:
     Returns:
         Tupla (width, height) em pixels
     """
-    # Remove formatação markdown para calcular largura visual
-    clean_line = _strip_markdown(line)
-
-    # Calcula largura base
-    width = len(clean_line) * CHAR_WIDTH
-
-    # Determina altura baseada no tipo de linha
-    if line.startswith("###"):
-        height = HEADER_LINE_HEIGHT + 4
-        width = int(width * 1.1)  # Headers são um pouco maiores
-    elif line.startswith("##"):
-        height = HEADER_LINE_HEIGHT + 8
-        width = int(width * 1.2)
-    elif line.startswith("#"):
-        height = HEADER_LINE_HEIGHT + 12
-        width = int(width * 1.3)
-    elif line.startswith("```") or line.startswith("`"):
-        height = CODE_LINE_HEIGHT
-        width = int(width * 0.9)  # Fonte monospace é mais estreita
-    elif line.startswith("- ") or line.startswith("• "):
-        height = LINE_HEIGHT
-        width += 16  # Espaço para bullet
-    elif line.strip() == "":
-        height = LINE_HEIGHT // 2  # Linhas vazias são menores
-    else:
-        height = LINE_HEIGHT
+    # Calcula largura base (visual, sem a formatação markdown)
+    width = _line_width(line)
 
-    return (width, height)
+    # Determina altura baseada no tipo de linha (prefixo mais longo primeiro)
+    spec = LINE_PREFIXES.get(line[:3]) or LINE_PREFIXES.get(line[:2]) or LINE_PREFIXES.get(line[:1])
+    if spec is not None:
+        height, scale, extra = spec
+        return (int(width * scale) + extra, height)
+    if line.strip() == "":
+        return (width, LINE_HEIGHT // 2)  # Linhas vazias são menores
+    return (width, LINE_HEIGHT)
+
+
+def _line_width(line: str) -> int:
+    """
+    Largura em pixels de uma linha, em fonte proporcional ou monospace.
+
+    Linhas de código (prefixo `) usam fonte monospace: cada coluna vale
+    CHAR_WIDTH, sem as correções de caracteres estreitos e largos.
+    """
+    if line.startswith("`"):
+        return _display_width(_strip_markdown(line)) * CHAR_WIDTH
+    return _visual_width(line)
+
+
+def _visual_width(line: str) -> int:
+    """Largura em pixels de uma linha depois de remover a formatação markdown."""
+    return _text_width(_strip_markdown(line))
 
 
 def _strip_markdown(text: str) -> str:
-    """Remove formatação markdown para obter texto visual."""
-    # Remove headers
-    text = re.sub(r"^#{1,6}\s*", "", text)
+    """
+    Remove formatação markdown para obter texto visual.
+
+    Cada substituição só roda se o texto tiver o caractere que ela procura
+    (as substituições só removem caracteres, então o teste é exato). A maioria
+    das linhas não tem formatação e sai sem passar por nenhuma regex.
+    """
+    # Caminho rápido: linha sem nenhum marcador de markdown
+    if not ("*" in text or "_" in text or "`" in text or "[" in text or text.startswith("#")):
+        return text
+
+    # Remove headers: até 6 "#" e os espaços seguintes (sem regex)
+    if text.startswith("#"):
+        stripped = text.lstrip("#")
+        if len(text) - len(stripped) > 6:
+            stripped = text[6:]
+        text = stripped.lstrip()
 
     # Remove bold/italic
-    text = re.sub(r"\*\*(.+?)\*\*", r"\1", text)
-    text = re.sub(r"__(.+?)__", r"\1", text)
-    text = re.sub(r"\*(.+?)\*", r"\1", text)
-    text = re.sub(r"_(.+?)_", r"\1", text)
+    text = _unwrap_delimited(text, "**")
+    text = _unwrap_delimited(text, "__")
+    text = _unwrap_delimited(text, "*")
+    text = _unwrap_delimited(text, "_")
 
     # Remove code inline
-    text = re.sub(r"`(.+?)`", r"\1", text)
+    text = _unwrap_delimited(text, "`")
 
     # Remove links
-    text = re.sub(r"\[(.+?)\]\(.+?\)", r"\1", text)
+    if "[" in text:
+        text = LINK_RE.sub(r"\1", text)
 
     return text
 
 
+def _unwrap_delimited(text: str, delimiter: str) -> str:
+    """
+    Troca cada `delimitador + conteúdo + delimitador` pelo conteúdo.
+
+    Equivale a re.sub(r"D(.+?)D", r"\1", text) para um delimitador literal D,
+    mas com str.find: o fechamento é a primeira ocorrência depois de pelo menos
+    um caractere de conteúdo e, se uma abertura não tem fechamento, nenhuma
+    abertura seguinte tem. Como o `.` da regex não atravessa quebras de linha,
+    cada linha é tratada separadamente.
+    """
+    find = text.find
+    start = find(delimiter)
+    if start < 0:
+        return text
+    if "\n" in text:
+        return "\n".join(_unwrap_delimited(line, delimiter) for line in text.split("\n"))
+
+    size = len(delimiter)
+    parts: list[str] = []
+    pos = 0
+    while start >= 0:
+        end = find(delimiter, start + size + 1)
+        if end < 0:
+            break
+        parts.append(text[pos:start])
+        parts.append(text[start + size : end])
+        pos = end + size
+        start = find(delimiter, pos)
+
+    if not parts:
+        return text
+    parts.append(text[pos:])
+    return "".join(parts)
+
+
+def _text_width(text: str) -> int:
+    """
+    Estima a largura de um texto em pixels.
+
+    Cada coluna (ver _display_width) vale CHAR_WIDTH, corrigida para os
+    caracteres ASCII estreitos e largos da fonte proporcional. As contagens
+    saem de str.translate (remoção dos caracteres), sem laço em Python.
+    """
+    narrow = len(text) - len(text.translate(_DELETE_NARROW))
+    wide = len(text) - len(text.translate(_DELETE_WIDE))
+    return (
+        _display_width(text) * CHAR_WIDTH
+        - narrow * (CHAR_WIDTH - NARROW_CHAR_WIDTH)
+        + wide * (WIDE_CHAR_WIDTH - CHAR_WIDTH)
+    )
+
+
+def _display_width(text: str) -> int:
+    """
+    Conta as colunas que um texto ocupa na tela.
+
+    Texto ASCII ocupa uma coluna por caractere (caminho rápido, só len). Fora
+    do ASCII, caracteres largos (CJK, emoji) ocupam duas colunas e marcas
+    combinantes e caracteres de formatação (ex: zero-width joiner) nenhuma.
+    """
+    if text.isascii():
+        return len(text)
+
+    width = 0
+    for char in text:
+        if unicodedata.combining(char) or unicodedata.category(char) in ("Me", "Cf"):
+            continue
+        width += 2 if unicodedata.east_asian_width(char) in ("W", "F") else 1
+    return width
+
+
+@lru_cache(maxsize=DIMENSIONS_CACHE_SIZE)
 def calculate_node_dimensions(
     text: str,
     node_type: str = "text",
@@ -134,26 +258,57 @@ def calculate_node_dimensions(
     Returns:
         Tupla (width, height) em pixels
     """
-    # Calcula dimensões do texto
-    text_width, text_height = calculate_text_dimensions(
-        text,
-        min_width=base_width,
-        max_width=max(base_width * 2, MAX_WIDTH),
-        min_height=base_height,
-    )
+    # Calcula dimensões do texto (texto vazio fica com as dimensões base)
+    if not text:
+        text_width, text_height = base_width, base_height
+    else:
+        text_width, text_height = calculate_text_dimensions(
+            text,
+            min_width=base_width,
+            max_width=max(base_width * 2, MAX_WIDTH),
+            min_height=base_height,
+        )
+
+    # Ajustes por tipo de node (um único lookup em vez da cadeia de comparações)
+    adjust = NODE_TYPE_ADJUSTMENTS.get(node_type)
+    if adjust is not None:
+        return adjust(text_width, text_height)
+    return (text_width, text_height)
 
-    # Ajustes por tipo de node
-    if node_type == "group":
-        # Grupos precisam de mais espaço para o label
-        text_height += 30
-    elif node_type == "decision":
-        # Decisões podem ser um pouco mais largas
-        text_width = max(text_width, 220)
-    elif node_type in ("start", "end"):
-        # Start/end podem ser mais compactos
-        text_width = max(min(text_width, 250), 180)
 
-    return (text_width, text_height)
+def _clamp(value: int, low: int, high: int) -> int:
+    """
+    Limita um valor ao intervalo [low, high] sem chamar min()/max().
+
+    Igual a max(low, min(high, value)): se low > high, low vence.
+    """
+    if value > high:
+        value = high
+    return low if value < low else value
+
+
+def _adjust_group(width: int, height: int) -> tuple[int, int]:
+    """Grupos precisam de mais espaço para o label."""
+    return (width, height + 30)
+
+
+def _adjust_decision(width: int, height: int) -> tuple[int, int]:
+    """Decisões podem ser um pouco mais largas."""
+    return (max(width, 220), height)
+
+
+def _adjust_terminal(width: int, height: int) -> tuple[int, int]:
+    """Start/end podem ser mais compactos."""
+    return (_clamp(width, 180, 250), height)
+
+
+# Tipo de node -> ajuste das dimensões do texto (tipos ausentes não mudam)
+NODE_TYPE_ADJUSTMENTS: dict[str, Callable[[int, int], tuple[int, int]]] = {
+    "group": _adjust_group,
+    "decision": _adjust_decision,
+    "start": _adjust_terminal,
+    "end": _adjust_terminal,
+}
 
 
 def estimate_wrapped_height(text: str, available_width: int) -> int:
@@ -170,25 +325,25 @@ def estimate_wrapped_height(text: str, available_width: int) -> int:
     if not text:
         return MIN_HEIGHT
 
-    lines = text.split("\n")
-    total_height = PADDING_VERTICAL * 2
-
-    content_width = available_width - PADDING_HORIZONTAL * 2
-
-    for line in lines:
-        clean_line = _strip_markdown(line)
-        line_width = len(clean_line) * CHAR_WIDTH
+    total_height = PADDING_VERTICAL_TOTAL
+    content_width = available_width - PADDING_HORIZONTAL_TOTAL
+    wraps = content_width > 0
 
+    for line in text.split("\n"):
         # Determina altura base da linha
-        if line.startswith("#"):
-            line_height = HEADER_LINE_HEIGHT
-        else:
-            line_height = LINE_HEIGHT
+        line_height = HEADER_LINE_HEIGHT if line.startswith("#") else LINE_HEIGHT
+
+        # Remover markdown só encurta a linha: se o texto cru já cabe, não há
+        # wrap e nem é preciso limpá-lo (linhas de código, em monospace, não
+        # passam por esse atalho proporcional)
+        if not wraps or (not line.startswith("`") and _text_width(line) <= content_width):
+            total_height += line_height
+            continue
 
         # Calcula linhas extras por wrap
-        if line_width > content_width and content_width > 0:
-            wrapped_lines = (line_width // content_width) + 1
-            total_height += line_height * wrapped_lines
+        line_width = _line_width(line)
+        if line_width > content_width:
+            total_height += line_height * (line_width // content_width + 1)
         else:
             total_height += line_height
 
@@ -1,8 +1,49 @@
 """Testes para o módulo processor."""
 
+import ast
+from pathlib import Path
+
+import pytest
+
 from lerigou.processor.adapter import CodeToCanvasAdapter
 from lerigou.processor.analyzers.python import PythonAnalyzer
-from lerigou.processor.models import CodeElement, ElementType, Parameter
+from lerigou.processor.analyzers.typescript import TypeScriptAnalyzer
+from lerigou.processor.api_matcher import EndpointMatcher
+from lerigou.processor.ast_cache import AstDiskCache
+from lerigou.processor.collector import CodeChunk, CodeCollector
+from lerigou.processor.models import (
+    APICall,
+    CodeElement,
+    CodeGraph,
+    ElementType,
+    FunctionCall,
+    Import,
+    Parameter,
+)
+from lerigou.processor.parser import CodeParser
+from lerigou.processor.scanners.fastapi import FastAPIScanner
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+@pytest.fixture
+def collector(tmp_path):
+    """Coletor sobre o tmp_path, com o cache de ASTs em disco isolado."""
+    return CodeCollector(base_path=tmp_path, cache_dir=tmp_path / "cache")
+
+
+@pytest.fixture
+def parsed_files(monkeypatch):
+    """Nomes dos arquivos parseados pelo cache de ASTs, na ordem em que foram lidos."""
+    parsed: list[str] = []
+    parse = AstDiskCache.parse
+
+    def counting_parse(self, source, filename="<unknown>"):
+        parsed.append(Path(filename).name)
+        return parse(self, source, filename)
+
+    monkeypatch.setattr(AstDiskCache, "parse", counting_parse)
+    return parsed
 
 
 def test_code_element_creation():
@@ -99,6 +140,55 @@ def main():
     assert "print" in call_names
 
 
+def test_python_analyzer_parse_source_builds_tree_once(monkeypatch):
+    """Testa que parse_source parseia uma vez e devolve árvores independentes."""
+    import lerigou.processor.analyzers.python as python_module
+
+    parses = []
+    real_parse = ast.parse
+
+    def counting_parse(*args, **kwargs):
+        parses.append(args)
+        return real_parse(*args, **kwargs)
+
+    monkeypatch.setattr(python_module.ast, "parse", counting_parse)
+    source = """
+def helper():
+    pass
+"""
+
+    analyzer = PythonAnalyzer()
+    first = analyzer.parse_source(source, "module.py")
+    first.children.clear()
+
+    second = analyzer.parse_source(source, "module.py")
+    assert len(parses) == 2
+    assert len(second.children) == 1
+    assert second.children[0].parent is second
+
+
+def test_typescript_convert_deeply_nested_elements():
+    """Testa a conversão do JSON do parser TS sem limite de profundidade."""
+    depth = 2000
+    data = {"name": "module", "element_type": "module", "children": []}
+    current = data
+    for i in range(depth):
+        child = {"name": f"fn_{i}", "element_type": "function", "children": []}
+        current["children"].append(child)
+        current = child
+
+    analyzer = TypeScriptAnalyzer()
+    module = analyzer._convert_to_code_element(data, "deep.tsx")
+
+    element = module
+    for i in range(depth):
+        assert len(element.children) == 1
+        assert element.children[0].parent is element
+        element = element.children[0]
+        assert element.name == f"fn_{i}"
+        assert element.source_file == "deep.tsx"
+
+
 def test_code_to_canvas_adapter():
     """Testa o adapter de código para canvas."""
     source = '''
@@ -145,3 +235,456 @@ def test_code_element_qualified_name():
     cls.add_child(method)
 
     assert method.get_qualified_name() == "MyClass.my_method"
+
+
+def test_code_graph_callers():
+    """Testa o call graph reverso de CodeGraph."""
+    module = CodeElement(name="app", element_type=ElementType.MODULE)
+    main = CodeElement(
+        name="main",
+        element_type=ElementType.FUNCTION,
+        calls=[FunctionCall(name="helper"), FunctionCall(name="helper")],
+    )
+    other = CodeElement(
+        name="other", element_type=ElementType.FUNCTION, calls=[FunctionCall(name="helper")]
+    )
+    module.add_child(main)
+    module.add_child(other)
+
+    graph = CodeGraph(root=module)
+    graph.build_indices()
+
+    assert graph.get_callers("helper") == ["main", "other"]
+    assert graph.get_callers("main") == []
+    assert graph.get_callees("main") == ["helper", "helper"]
+
+
+def test_endpoint_matcher_fastapi_routes(tmp_path):
+    """Testa o matching de chamadas de API com os endpoints FastAPI."""
+    matcher = EndpointMatcher(FIXTURES_DIR / "backend", cache_dir=tmp_path)
+
+    results = matcher.match_all(
+        [
+            APICall(method="GET", path="/api/users", client="axios"),
+            APICall(method="DELETE", path="/api/users/42", client="fetch"),
+            APICall(method="GET", path="https://example.com/other", client="fetch"),
+        ]
+    )
+
+    assert results[0].backend_function == "list_users"
+    assert results[1].backend_function == "delete_user"
+    assert results[2].is_external
+    # As ASTs dos arquivos escaneados vão para o cache em disco
+    assert list(tmp_path.rglob("*.pkl"))
+
+
+def test_endpoint_matcher_duplicate_endpoints_last_wins(tmp_path):
+    """Testa que, com endpoints repetidos, vale a última definição escaneada."""
+    route = (
+        "from fastapi import FastAPI\n"
+        "app = FastAPI()\n"
+        "@app.get('/health')\n"
+        "def {name}():\n"
+        "    pass\n"
+    )
+    # Os arquivos de um diretório são escaneados antes dos subdiretórios
+    (tmp_path / "routes.py").write_text(route.format(name="root_health"))
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "routes.py").write_text(route.format(name="sub_health"))
+    api_call = APICall(method="GET", path="/health", client="fetch")
+
+    matcher = EndpointMatcher(tmp_path, cache_dir=tmp_path / "cache")
+
+    assert matcher.match(api_call).backend_function == "sub_health"
+    assert [r.backend_function for r in matcher.match_all([api_call])] == ["sub_health"]
+    assert [e.function_name for e in matcher.get_all_endpoints()] == ["sub_health"]
+
+
+def test_fastapi_scanner_find_endpoint_by_method(tmp_path):
+    """Testa que a busca com path parameters só considera o método pedido."""
+    (tmp_path / "routes.py").write_text(
+        "from fastapi import APIRouter\n"
+        "router = APIRouter(prefix='/items')\n"
+        "@router.get('/{item_id}')\n"
+        "def get_item(item_id):\n"
+        "    pass\n"
+        "@router.put('/{item_id}')\n"
+        "def update_item(item_id):\n"
+        "    pass\n"
+    )
+
+    scanner = FastAPIScanner(cache_dir=tmp_path / "cache")
+    scanner.scan_repository(tmp_path)
+
+    assert scanner.find_endpoint("put", "/items/7").function_name == "update_item"
+    assert scanner.find_endpoint("GET", "/items/7").function_name == "get_item"
+    assert scanner.find_endpoint("DELETE", "/items/7") is None
+
+
+def test_fastapi_scanner_skips_files_without_routes(tmp_path):
+    """Testa que arquivos sem decorators de rota nem routers não são parseados."""
+    (tmp_path / "consts.py").write_text("TIMEOUT = 30\n\ndef helper():\n    return TIMEOUT\n")
+    (tmp_path / "models.py").write_text(
+        "from dataclasses import dataclass\n@dataclass\nclass User:\n    name: str\n"
+    )
+    (tmp_path / "routes.py").write_text(
+        "from fastapi import FastAPI\n"
+        "app = FastAPI()\n"
+        "@app.get('/health')\n"
+        "def health():\n"
+        "    pass\n"
+    )
+
+    scanner = FastAPIScanner(cache_dir=tmp_path / "cache")
+
+    assert list(scanner.scan_repository(tmp_path)) == ["GET:/health"]
+    assert len(list((tmp_path / "cache").rglob("*.pkl"))) == 1
+
+
+def test_ast_disk_cache_roundtrip(tmp_path):
+    """Testa que o cache em disco reaproveita e regrava árvores AST."""
+    source = "def main():\n    return helper()\n"
+    cache = AstDiskCache(tmp_path)
+
+    tree = cache.parse(source, "main.py")
+    cache_files = list(cache.cache_dir.glob("*/*.pkl"))
+    assert len(cache_files) == 1
+
+    cached = cache.parse(source, "main.py")
+    assert ast.dump(cached) == ast.dump(tree)
+
+    # Entradas corrompidas são ignoradas e regravadas
+    cache_files[0].write_bytes(b"not a pickle")
+    reparsed = cache.parse(source, "main.py")
+    assert ast.dump(reparsed) == ast.dump(tree)
+    assert ast.dump(cache._load(cache_files[0])) == ast.dump(tree)
+
+
+def test_collector_reuses_caches_and_sees_file_changes(tmp_path, collector, parsed_files):
+    """Testa que os caches do coletor persistem entre coletas e são revalidados."""
+    source_file = tmp_path / "app.py"
+    source_file.write_text("def main():\n    helper()\n\ndef helper():\n    pass\n")
+
+    first = collector.collect_from_entrypoint(source_file, "main")
+    assert {c.name for c in first.chunks} == {"main", "helper"}
+
+    second = collector.collect_from_entrypoint(source_file, "main")
+    assert {c.name for c in second.chunks} == {"main", "helper"}
+    assert parsed_files == ["app.py"]
+
+    source_file.write_text("def main():\n    other()\n\ndef other():\n    return 1\n")
+    third = collector.collect_from_entrypoint(source_file, "main")
+    assert {c.name for c in third.chunks} == {"main", "other"}
+    assert parsed_files == ["app.py", "app.py"]
+
+
+def test_collector_follows_calls_across_files(tmp_path, collector):
+    """Testa que o coletor segue chamadas para funções importadas de outros arquivos."""
+    (tmp_path / "helpers.py").write_text(
+        "def helper():\n    return format_value(1)\n\n"
+        "def format_value(value):\n    return str(value)\n\n"
+        "def unused():\n    pass\n"
+    )
+    source_file = tmp_path / "app.py"
+    source_file.write_text("from helpers import helper\n\ndef main():\n    return helper()\n")
+
+    collected = collector.collect_from_entrypoint(source_file, "main")
+
+    assert {c.name for c in collected.chunks} == {"main", "helper", "format_value"}
+
+
+def test_collector_calls_keep_source_order(tmp_path, collector):
+    """Testa que as chamadas coletadas são únicas e seguem a ordem do código."""
+    source_file = tmp_path / "app.py"
+    source_file.write_text(
+        "def main(items):\n"
+        "    load(items)\n"
+        "    for item in items:\n"
+        "        save(transform(item))\n"
+        "    load(items)\n"
+        "    return report.build()\n"
+    )
+
+    collected = collector.collect_from_entrypoint(source_file, "main")
+
+    assert collected.chunks[0].calls == ["load", "save", "transform", "report.build"]
+
+
+def test_collector_orders_chunks_callers_first(tmp_path, collector):
+    """Testa que os chunks saem em ordem topológica (chamadores primeiro)."""
+    source_file = tmp_path / "app.py"
+    source_file.write_text(
+        "def alpha():\n    return beta()\n\n"
+        "def beta():\n    return alpha()\n\n"
+        "def zeta():\n    return alpha()\n\n"
+        "def main():\n    return zeta()\n"
+    )
+
+    collected = collector.collect_from_entrypoint(source_file, "main")
+
+    # alpha/beta formam um ciclo e vão para o final, em ordem de nome
+    assert [c.name for c in collected.chunks] == ["main", "zeta", "alpha", "beta"]
+
+
+def test_collector_follows_repeated_calls_once(tmp_path, collector, parsed_files):
+    """Testa que chamadas repetidas (resolvidas ou não) geram um chunk e um parse só."""
+    (tmp_path / "helpers.py").write_text("def helper():\n    return 3\n")
+    source_file = tmp_path / "app.py"
+    source_file.write_text(
+        "from helpers import helper\n\n"
+        "def main():\n    print(1)\n    helper()\n    return other()\n\n"
+        "def other():\n    print(2)\n    return helper()\n"
+    )
+
+    collected = collector.collect_from_entrypoint(source_file, "main")
+
+    assert [c.name for c in collected.chunks] == ["main", "other", "helper"]
+    assert parsed_files == ["app.py", "helpers.py"]
+
+
+def test_collector_skips_parsing_leaf_modules_without_symbol(tmp_path, collector, parsed_files):
+    """Testa que módulos sem imports e sem o símbolo buscado não são parseados."""
+    (tmp_path / "consts.py").write_text("VALUE = 1\n\ndef other():\n    return VALUE\n")
+    (tmp_path / "helpers.py").write_text("def helper():\n    return 2\n")
+    source_file = tmp_path / "app.py"
+    source_file.write_text(
+        "import consts\nfrom helpers import helper\n\n"
+        "def main():\n    consts.missing()\n    return helper()\n"
+    )
+
+    collected = collector.collect_from_entrypoint(source_file, "main")
+
+    assert {c.name for c in collected.chunks} == {"main", "helper"}
+    assert parsed_files == ["app.py", "helpers.py"]
+
+
+def test_code_chunk_extracts_code_lazily(tmp_path, collector):
+    """Testa que, sem código explícito, o chunk o extrai do arquivo uma única vez."""
+    source_file = tmp_path / "app.py"
+    source_file.write_text("import os\n\ndef main():\n    return os.getcwd()\n")
+
+    chunk = collector.collect_from_entrypoint(source_file, "main").chunks[0]
+
+    assert chunk.code == "def main():\n    return os.getcwd()"
+    assert chunk.code is chunk.code
+
+
+def test_code_chunk_accepts_explicit_code():
+    """Testa que o código passado ao construtor é usado e entra na igualdade."""
+    fields = {"name": "main", "file_path": "app.py", "line_start": 1, "line_end": 1}
+    chunk = CodeChunk(code="pass", chunk_type="function", **fields)
+
+    assert chunk.code == "pass"
+    assert chunk != CodeChunk(code="...", chunk_type="function", **fields)
+
+
+def test_collector_resolves_ts_imports(tmp_path, collector):
+    """Testa a resolução de imports TS (alias @/ e relativos)."""
+    frontend = tmp_path / "frontend"
+    (frontend / "src" / "services").mkdir(parents=True)
+    (frontend / "src" / "components" / "forms").mkdir(parents=True)
+    (frontend / "package.json").write_text("{}")
+    service = frontend / "src" / "services" / "api.ts"
+    service.write_text("export const get = () => fetch('/api');\n")
+    component = frontend / "src" / "components" / "forms" / "Form.tsx"
+    # Fica num diretório já percorrido na busca pelo src/ a partir de `component`
+    sibling = frontend / "src" / "components" / "Page.tsx"
+
+    assert collector._resolve_ts_import("@/services/api", component) == service
+    assert collector._resolve_ts_import("../../services/api", component).resolve() == service
+    assert collector._resolve_ts_import("react", component) is None
+    assert collector._resolve_ts_import("@/services/missing", component) is None
+    assert collector._resolve_ts_import("@/services/api", sibling) == service
+
+
+class FakeComponentParser(CodeParser):
+    """Parser de componentes falso: o módulo só tem as chamadas de API dadas."""
+
+    def __init__(self, api_calls: list[APICall]):
+        self.api_calls = api_calls
+
+    def parse_file(self, file_path: Path) -> CodeElement:
+        return self.parse_source("", str(file_path))
+
+    def parse_source(self, source: str, file_name: str = "<string>") -> CodeElement:
+        module = CodeElement(name=Path(file_name).stem, element_type=ElementType.MODULE)
+        module.api_calls.extend(self.api_calls)
+        return module
+
+    def supports_extension(self, extension: str) -> bool:
+        return extension == ".tsx"
+
+
+def collect_component_api_calls(collector, monkeypatch, api_calls):
+    """Coleta um componente falso com as chamadas dadas e retorna as chamadas coletadas."""
+    import lerigou.processor.collector as collector_module
+
+    parser = FakeComponentParser(api_calls)
+    monkeypatch.setattr(collector_module, "get_parser_for_file", lambda _: parser)
+    return collector.collect_from_entrypoint(collector.base_path / "App.tsx").api_calls
+
+
+def test_collector_deduplicates_api_calls_after_match_updates(collector, monkeypatch):
+    """Testa que chamadas de API não se repetem, mesmo após o match alterá-las."""
+    api_call = APICall(method="GET", path="/users", client="fetch", line_number=3)
+    api_calls = collect_component_api_calls(
+        collector,
+        monkeypatch,
+        [
+            api_call,
+            api_call,
+            APICall(method="GET", path="/users", client="fetch", line_number=3),
+            APICall(method="GET", path="/users", client="fetch", line_number=9),
+        ],
+    )
+
+    assert [c.line_number for c in api_calls] == [3, 9]
+    assert all(c.is_external for c in api_calls)
+
+
+def test_collector_keeps_api_calls_from_different_files(collector, monkeypatch):
+    """Testa que chamadas na mesma linha de arquivos diferentes não se fundem."""
+    api_calls = collect_component_api_calls(
+        collector,
+        monkeypatch,
+        [
+            APICall(method="GET", path="/users", client="fetch", line_number=3, file_path=file_path)
+            for file_path in ("Users.tsx", "Orders.tsx")
+        ],
+    )
+
+    assert [c.file_path for c in api_calls] == ["Users.tsx", "Orders.tsx"]
+
+
+class FakeServiceParser(CodeParser):
+    """Parser de serviços falso: cada arquivo tem uma função `get` com uma chamada."""
+
+    def parse_file(self, file_path: Path) -> CodeElement:
+        return self.parse_source("", str(file_path))
+
+    def parse_source(self, source: str, file_name: str = "<string>") -> CodeElement:
+        name = Path(file_name).stem
+        module = CodeElement(name=name, element_type=ElementType.MODULE)
+        function = CodeElement(name="get", element_type=ElementType.FUNCTION)
+        function.api_calls.append(APICall(method="GET", path=f"/{name}", client="fetch"))
+        module.add_child(function)
+        return module
+
+    def supports_extension(self, extension: str) -> bool:
+        return extension == ".ts"
+
+
+def test_collector_parses_service_files_in_order(tmp_path, monkeypatch, collector):
+    """Testa que os serviços parseados em paralelo são agregados na ordem dos imports."""
+    import lerigou.processor.collector as collector_module
+
+    monkeypatch.setattr(collector_module, "get_parser_for_file", lambda _: FakeServiceParser())
+    names = ["users", "orders", "items"]
+    for name in names:
+        (tmp_path / f"{name}.ts").write_text("export const get = () => null;\n")
+    component = tmp_path / "App.tsx"
+
+    imports = [Import(module=f"./{name}") for name in names]
+    usage = {f"./{name}": {"get"} for name in names}
+    api_calls = collector._collect_service_api_calls(component, imports, usage)
+
+    assert [c.path for c in api_calls] == ["/users", "/orders", "/items"]
+
+
+def test_collector_finds_used_service_functions():
+    """Testa o mapeamento de chamadas para funções de serviço (com aliases)."""
+    component = CodeElement(name="App", element_type=ElementType.FUNCTION)
+    component.calls = [
+        FunctionCall(name="getUsers"),
+        FunctionCall(name="create", target="api"),
+        FunctionCall(name="unrelated"),
+        FunctionCall(name="list", target="orders"),
+    ]
+    imports = [
+        Import(
+            module="@/services/users",
+            specifiers=[{"local": "getUsers", "imported": "fetchUsers"}],
+        ),
+        Import(module="@/services/api", specifiers=[{"local": "api", "imported": "default"}]),
+        Import(module="@/services/orders", names=["orders"]),
+        Import(module="@/services/unused", names=["unused"]),
+    ]
+
+    usage = CodeCollector()._find_used_service_functions(component, imports)
+
+    assert usage == {
+        "@/services/users": {"fetchUsers"},
+        "@/services/api": {"create"},
+        "@/services/orders": {"orders"},
+    }
+
+
+def test_collector_collects_method_entrypoint(tmp_path, collector):
+    """Testa um entrypoint Classe.método resolvido pelo índice de símbolos."""
+    source_file = tmp_path / "app.py"
+    source_file.write_text(
+        "def helper():\n    return 1\n\n"
+        "class Service:\n"
+        "    def run(self):\n        return helper()\n\n"
+        "    def other(self):\n        return 2\n"
+    )
+
+    collected = collector.collect_from_entrypoint(source_file, "Service.run")
+
+    assert [c.name for c in collected.chunks] == ["Service.run", "helper"]
+    assert collected.chunks[0].chunk_type == "method"
+
+
+def test_code_chunk_lines_follow_ast_numbering(tmp_path, collector):
+    """Testa que só \\n separa linhas ao extrair código (como na numeração do ast)."""
+    source_file = tmp_path / "app.py"
+    source_file.write_text('X = "a\\x0cb"\n\ndef main():\n    return X\n')
+
+    chunk = collector.collect_from_entrypoint(source_file, "main").chunks[0]
+
+    assert chunk.code == "def main():\n    return X"
+
+
+def test_collector_all_imports_are_unique_and_ordered(tmp_path, collector):
+    """Testa que all_imports não repete imports e segue a ordem dos chunks."""
+    source_file = tmp_path / "app.py"
+    source_file.write_text(
+        "import os\nimport json\nimport sys\n\n"
+        "def main():\n    helper()\n    return sys.argv, os.sep\n\n"
+        "def helper():\n    return json.dumps(os.sep)\n"
+    )
+
+    collected = collector.collect_from_entrypoint(source_file, "main")
+
+    assert [c.name for c in collected.chunks] == ["main", "helper"]
+    assert collected.all_imports == ["os", "sys", "json"]
+
+
+def test_collector_extracts_docstrings_only_when_requested(tmp_path, collector):
+    """Testa que as docstrings dos chunks são opcionais."""
+    source_file = tmp_path / "app.py"
+    source_file.write_text('def main():\n    """Ponto de entrada."""\n    return 1\n')
+
+    assert collector.collect_from_entrypoint(source_file, "main").chunks[0].docstring is None
+
+    with_docstrings = CodeCollector(
+        base_path=tmp_path, cache_dir=tmp_path / "cache", include_docstrings=True
+    )
+    chunk = with_docstrings.collect_from_entrypoint(source_file, "main").chunks[0]
+    assert chunk.docstring == "Ponto de entrada."
+
+
+def test_collector_orders_chunks_after_cycles_callers_first(tmp_path, collector):
+    """Testa que chunks chamados a partir de um ciclo ainda vêm depois de quem os chama."""
+    source_file = tmp_path / "app.py"
+    source_file.write_text(
+        "def main():\n    return alpha()\n\n"
+        "def alpha():\n    return beta()\n\n"
+        "def beta():\n    return alpha() or omega()\n\n"
+        "def omega():\n    return aaa()\n\n"
+        "def aaa():\n    return 1\n"
+    )
+
+    collected = collector.collect_from_entrypoint(source_file, "main")
+
+    assert [c.name for c in collected.chunks] == ["main", "alpha", "beta", "omega", "aaa"]
@@ -0,0 +1,62 @@
+"""Testes para o módulo utils."""
+
+from lerigou.utils.text_dimensions import (
+    CHAR_WIDTH,
+    LINE_HEIGHT,
+    MIN_HEIGHT,
+    NARROW_CHAR_WIDTH,
+    PADDING_HORIZONTAL,
+    PADDING_VERTICAL,
+    WIDE_CHAR_WIDTH,
+    _display_width,
+    _text_width,
+    calculate_text_dimensions,
+    estimate_wrapped_height,
+)
+
+
+def test_display_width():
+    """Testa a contagem de colunas para texto ASCII, largo e combinante."""
+    assert _display_width("abc") == 3
+    assert _display_width("ação") == 4
+    assert _display_width("日本") == 4
+    assert _display_width("e\u0301") == 1
+
+
+def test_text_width_proportional():
+    """Testa que caracteres estreitos e largos têm larguras diferentes da média."""
+    assert _text_width("abc") == 3 * CHAR_WIDTH
+    assert _text_width("il") == 2 * NARROW_CHAR_WIDTH
+    assert _text_width("mW") == 2 * WIDE_CHAR_WIDTH
+    assert _text_width("日i") == 2 * CHAR_WIDTH + NARROW_CHAR_WIDTH
+
+
+def test_text_dimensions_wide_chars():
+    """Testa que caracteres largos contam como duas colunas na largura."""
+    ascii_width, _ = calculate_text_dimensions("ab" * 20, min_width=0)
+    wide_width, _ = calculate_text_dimensions("日" * 20, min_width=0)
+
+    assert ascii_width == 40 * CHAR_WIDTH + PADDING_HORIZONTAL * 2
+    assert wide_width == ascii_width
+
+
+def test_estimate_wrapped_height_wide_chars():
+    """Testa que linhas com caracteres largos quebram pela largura visual."""
+    available_width = 20 * CHAR_WIDTH + PADDING_HORIZONTAL * 2
+
+    assert estimate_wrapped_height("a" * 20, available_width) == max(
+        MIN_HEIGHT, PADDING_VERTICAL * 2 + LINE_HEIGHT
+    )
+    assert estimate_wrapped_height("日" * 20, available_width) == max(
+        MIN_HEIGHT, PADDING_VERTICAL * 2 + LINE_HEIGHT * 3
+    )
+
+
+def test_code_lines_use_monospace_width():
+    """Testa que linhas de código (prefixo `) são medidas em monospace."""
+    inline_width, _ = calculate_text_dimensions("`fill_list(items[i])`", min_width=0)
+    assert inline_width == int(19 * CHAR_WIDTH * 0.9) + PADDING_HORIZONTAL * 2
+
+    # Sem o prefixo, o mesmo texto usa a fonte proporcional (mais estreita)
+    text_width, _ = calculate_text_dimensions("fill_list(items[i])", min_width=0)
+    assert text_width < inline_width